@@ -0,0 +1,280 @@
+"""
+Benchmarks for the valuation and notification hot paths.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+
+Each benchmark is run at several portfolio sizes and the best of a few
+repeats is reported. Results are saved as JSON so that runs can be
+compared across commits with --compare.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# run against the working tree rather than an installed package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pylookback.assets import (  # noqa: E402
+    Asset,
+    Cash,
+    FxRate,
+    Portfolio,
+    Stock,
+)
+
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def best_of(repeat, func, setup):
+    """ Return the fastest of several timed runs.
+        setup returns the argument passed to func and is not timed.
+    """
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        start = time.perf_counter()
+        func(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del state
+    return best
+
+
+def make_stocks(size, currency_code="USD"):
+    return [
+        Stock("BENCH %d" % i, 1.0 + i % 100, currency_code)
+        for i in range(size)
+    ]
+
+
+def make_portfolio(size, lazy=False):
+    """ A portfolio in AUD holding USD stocks and cash. """
+    audusd = FxRate("AUDUSD", 0.65)
+    usd = Cash("USD")
+    stocks = make_stocks(size)
+    portfolio = Portfolio("AUD", lazy)
+    portfolio.transfer(usd, 1e6)
+    for stock in stocks:
+        portfolio.transfer(stock, 100)
+    return portfolio, stocks, usd, audusd
+
+
+@benchmark
+def asset_construction(size, repeat):
+    """ Construct size stocks (each validates and registers its code). """
+    seconds = best_of(repeat, make_stocks, lambda: size)
+    return seconds, size
+
+
+@benchmark
+def portfolio_transfer(size, repeat):
+    """ Transfer size new stocks into an empty portfolio. """
+
+    def setup():
+        return Portfolio("AUD"), make_stocks(size), FxRate("AUDUSD", 0.65)
+
+    def run(state):
+        portfolio, stocks, _ = state
+        for stock in stocks:
+            portfolio.transfer(stock, 100)
+
+    return best_of(repeat, run, setup), size
+
+
+@benchmark
+def portfolio_trade(size, repeat):
+    """ Trade every existing holding in a portfolio of size holdings. """
+
+    def run(state):
+        portfolio, stocks, _, _ = state
+        for stock in stocks:
+            portfolio.trade(stock, 10)
+
+    return best_of(repeat, run, lambda: make_portfolio(size)), size
+
+
+@benchmark
+def price_tick(size, repeat):
+    """ Set one price at a time, notifying its holding and portfolio. """
+    ticks = min(size, 10000)
+
+    def run(state):
+        _, stocks, _, _ = state
+        for stock in stocks[:ticks]:
+            stock.price = stock.price + 0.01
+
+    return best_of(repeat, run, lambda: make_portfolio(size)), ticks
+
+
+@benchmark
+def batched_price_update(size, repeat):
+    """ Update every price in one call to Asset.update_prices. """
+
+    def setup():
+        state = make_portfolio(size)
+        prices = {stock.code: stock.price + 0.01 for stock in state[1]}
+        return state, prices
+
+    def run(state):
+        Asset.update_prices(state[1])
+
+    return best_of(repeat, run, setup), size
+
+
+@benchmark
+def fx_rate_tick(size, repeat):
+    """ Move the one fx rate that every holding depends on. """
+    ticks = 10
+
+    def run(state):
+        _, _, _, audusd = state
+        for i in range(ticks):
+            audusd.rate = 0.65 + i * 1e-3
+
+    return best_of(repeat, run, lambda: make_portfolio(size)), ticks
+
+
+@benchmark
+def lazy_tick_storm(size, repeat):
+    """ Tick every price and the fx rate ten times in a lazy portfolio,
+        reading its value once at the end.
+    """
+    rounds = 10
+
+    def run(state):
+        portfolio, stocks, _, audusd = state
+        for i in range(rounds):
+            for stock in stocks:
+                stock.price = stock.price + 0.01
+            audusd.rate = 0.65 + i * 1e-3
+        portfolio.value
+
+    def setup():
+        return make_portfolio(size, lazy=True)
+
+    return best_of(repeat, run, setup), rounds * (size + 1)
+
+
+@benchmark
+def fx_rate_get(size, repeat):
+    """ Look up direct, inverse and cross rates. """
+    lookups = 10000
+    pairs = ("AUDUSD", "USDAUD", "EURAUD")
+
+    def setup():
+        return FxRate("AUDUSD", 0.65), FxRate("EURUSD", 1.1)
+
+    def run(state):
+        get = FxRate.get
+        for _ in range(lookups):
+            for pair in pairs:
+                get(pair)
+
+    return best_of(repeat, run, setup), lookups * len(pairs)
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def run(names, sizes, repeat):
+    results = []
+    for func in BENCHMARKS:
+        if names and func.__name__ not in names:
+            continue
+        for size in sizes:
+            seconds, operations = func(size, repeat)
+            result = {
+                "name": func.__name__,
+                "size": size,
+                "seconds": seconds,
+                "operations": operations,
+                "per_operation_us": seconds / operations * 1e6,
+            }
+            results.append(result)
+            print(
+                "%-22s size=%-7d %10.4fs %10.3fus/op"
+                % (func.__name__, size, seconds, result["per_operation_us"])
+            )
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    previous = {
+        (result["name"], result["size"]): result["per_operation_us"]
+        for result in baseline["results"]
+    }
+    print("\ncompared with %s (%s)" % (baseline_path, baseline["revision"]))
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before:
+            print(
+                "%-22s size=%-7d %+8.1f%%"
+                % (
+                    result["name"],
+                    result["size"],
+                    (result["per_operation_us"] / before - 1) * 100,
+                )
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="portfolio sizes (number of holdings)",
+    )
+    parser.add_argument(
+        "--only", nargs="+", default=(), help="benchmark names to run"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="save results to this json file")
+    parser.add_argument("--compare", help="a previous json file to compare")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,3 @@
 from .assets import Asset, Stock, Cash  # noqa: F401
 from .assets import FxRate  # noqa: F401
+from .assets import MarketContext  # noqa: F401
@@ -0,0 +1,311 @@
+"""
+Check portfolios against compliance rules before and after trading.
+
+Rules are evaluated against a ComplianceContext, a columnar view of a
+portfolio (codes, units and base currency values) together with the
+aggregates the rules need (value, gross exposure, currency exposures,
+short positions and the largest holdings). Post trade checks run over
+the columns with map and compress rather than looping over holdings in
+Python. Pre trade checks only look at the legs of the proposed trade
+(see Portfolio.what_if_trade) against the context's aggregates, so each
+candidate order is checked in constant time.
+"""
+import heapq
+from abc import ABC, abstractmethod
+from array import array
+from collections import namedtuple
+from itertools import compress
+from math import fsum
+from operator import itemgetter
+from .actor import Actor
+from ..assets import Cash
+
+
+# value is the measure that broke the limit, e.g. a weight
+Breach = namedtuple("Breach", ["rule", "code", "value", "limit"])
+
+# the number of largest holdings kept for pre trade concentration checks,
+# enough to find the largest holding not changed by a trade
+_TOP = 3
+
+
+class ComplianceContext:
+    """ A portfolio's holdings as columns at one point in time. """
+
+    def __init__(self, portfolio):
+        codes = portfolio.holding_codes()
+        self.codes = codes
+        self.units = array("d", map(portfolio.get_holding_units, codes))
+        self.values = array("d", map(portfolio.get_holding_value, codes))
+        assets = list(map(portfolio.context.get_asset, codes))
+        self.currency_codes = [asset.currency_code for asset in assets]
+        self.cash_codes = frozenset(
+            compress(codes, (isinstance(asset, Cash) for asset in assets))
+        )
+        self.value = portfolio.value
+        self._rows = {code: row for row, code in enumerate(codes)}
+
+        is_risk = [code not in self.cash_codes for code in codes]
+        abs_values = list(map(abs, self.values))
+        self.gross = fsum(compress(abs_values, is_risk))
+        self.short_codes = frozenset(
+            compress(codes, map((0.0).__gt__, self.units))
+        )
+        ranked = list(zip(abs_values, codes))
+        self.largest = heapq.nlargest(_TOP, ranked, key=itemgetter(0))
+        self.largest_risk = heapq.nlargest(
+            _TOP, compress(ranked, is_risk), key=itemgetter(0)
+        )
+        self.exposures = portfolio.currency_exposures()
+
+    def get_value(self, code):
+        row = self._rows.get(code)
+        return 0.0 if row is None else self.values[row]
+
+    def get_units(self, code):
+        row = self._rows.get(code)
+        return 0.0 if row is None else self.units[row]
+
+    def is_cash(self, code):
+        return code in self.cash_codes
+
+
+def _traded_values(context, legs):
+    """ Return the portfolio value and each traded code's value
+        after the legs are applied.
+    """
+    values = dict()
+    for leg in legs:
+        value = values.get(leg.code)
+        if value is None:
+            value = context.get_value(leg.code)
+        values[leg.code] = value + leg.value
+    return context.value + fsum(leg.value for leg in legs), values
+
+
+def _weight(value, portfolio_value):
+    if portfolio_value <= 0:
+        return float("inf")
+    return abs(value) / portfolio_value
+
+
+class Rule(ABC):
+    """ A limit on a portfolio. """
+
+    @abstractmethod
+    def check(self, context):
+        """ Return the breaches in a portfolio as it is. """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def check_trade(self, context, legs):
+        """ Return the breaches in a portfolio after the trade legs. """
+        raise NotImplementedError()
+
+
+class ConcentrationLimit(Rule):
+    """ No holding may be more than max_weight of the portfolio value.
+        Cash is excluded unless include_cash. Pre trade checks report
+        at most a few of the holdings that the trade does not change.
+    """
+
+    def __init__(self, max_weight, include_cash=False):
+        self.max_weight = max_weight
+        self.include_cash = include_cash
+
+    def check(self, context):
+        limit = self.max_weight * context.value
+        over = map(limit.__lt__, map(abs, context.values))
+        rows = compress(range(len(context.codes)), over)
+        return [
+            self._breach(context.codes[row], context.values[row], context)
+            for row in rows
+            if self.include_cash or not context.is_cash(context.codes[row])
+        ]
+
+    def _breach(self, code, value, context, portfolio_value=None):
+        if portfolio_value is None:
+            portfolio_value = context.value
+        weight = _weight(value, portfolio_value)
+        return Breach(self, code, weight, self.max_weight)
+
+    def check_trade(self, context, legs):
+        portfolio_value, values = _traded_values(context, legs)
+        cash = {leg.code: leg.cash for leg in legs}
+        limit = self.max_weight * portfolio_value
+        breaches = [
+            self._breach(code, value, context, portfolio_value)
+            for code, value in values.items()
+            if abs(value) > limit and (self.include_cash or not cash[code])
+        ]
+        if self.include_cash:
+            largest = context.largest
+        else:
+            largest = context.largest_risk
+        # the largest holdings the trade does not change
+        for abs_value, code in largest:
+            if code in values:
+                continue
+            if abs_value <= limit:
+                break
+            breaches.append(
+                self._breach(code, abs_value, context, portfolio_value)
+            )
+        return breaches
+
+
+class CurrencyExposureCap(Rule):
+    """ Holdings (including cash) in a currency may not be worth more
+        than max_weight of the portfolio value, long or short.
+    """
+
+    def __init__(self, currency_code, max_weight):
+        self.currency_code = str(currency_code).strip().upper()
+        self.max_weight = max_weight
+
+    def _check(self, exposure, portfolio_value):
+        if abs(exposure) <= self.max_weight * portfolio_value:
+            return []
+        weight = _weight(exposure, portfolio_value)
+        return [Breach(self, self.currency_code, weight, self.max_weight)]
+
+    def check(self, context):
+        exposure = context.exposures.get(self.currency_code, 0.0)
+        return self._check(exposure, context.value)
+
+    def check_trade(self, context, legs):
+        currency_code = self.currency_code
+        exposure = context.exposures.get(currency_code, 0.0)
+        exposure += fsum(
+            leg.value for leg in legs if leg.currency_code == currency_code
+        )
+        portfolio_value = context.value + fsum(leg.value for leg in legs)
+        return self._check(exposure, portfolio_value)
+
+
+class NoShortPositions(Rule):
+    """ No holding may have negative units.
+        Cash is excluded (it may be borrowed) unless include_cash.
+    """
+
+    def __init__(self, include_cash=False):
+        self.include_cash = include_cash
+
+    def _breaches(self, context, units):
+        return [
+            Breach(self, code, code_units, 0.0)
+            for code, code_units in units
+            if self.include_cash or not context.is_cash(code)
+        ]
+
+    def check(self, context):
+        units = (
+            (code, context.get_units(code)) for code in context.short_codes
+        )
+        return self._breaches(context, sorted(units))
+
+    def check_trade(self, context, legs):
+        traded = dict()
+        for leg in legs:
+            if leg.cash and not self.include_cash:
+                continue
+            code_units = traded.get(leg.code)
+            if code_units is None:
+                code_units = context.get_units(leg.code)
+            traded[leg.code] = code_units + leg.units
+        units = [
+            (code, context.get_units(code))
+            for code in context.short_codes
+            if code not in traded
+        ]
+        units.extend(
+            (code, code_units)
+            for code, code_units in traded.items()
+            if code_units < 0
+        )
+        return self._breaches(context, sorted(units))
+
+
+class MaxGrossExposure(Rule):
+    """ The total absolute value of non cash holdings may not be more
+        than max_leverage times the portfolio value.
+    """
+
+    def __init__(self, max_leverage):
+        self.max_leverage = max_leverage
+
+    def _check(self, gross, portfolio_value):
+        if gross <= self.max_leverage * portfolio_value:
+            return []
+        leverage = _weight(gross, portfolio_value)
+        return [Breach(self, None, leverage, self.max_leverage)]
+
+    def check(self, context):
+        return self._check(context.gross, context.value)
+
+    def check_trade(self, context, legs):
+        portfolio_value, values = _traded_values(context, legs)
+        cash = {leg.code: leg.cash for leg in legs}
+        gross = context.gross
+        for code, value in values.items():
+            if not cash[code]:
+                gross += abs(value) - abs(context.get_value(code))
+        return self._check(gross, portfolio_value)
+
+
+class Compliance(Actor):
+    """ Check a portfolio against rules.
+        The context is rebuilt (once) after the portfolio changes, so
+        any number of candidate trades can be checked against it.
+        Performing records the portfolio's current breaches.
+    """
+
+    def __init__(self, portfolio, rules=()):
+        super().__init__(portfolio, None)
+        self._rules = list(rules)
+        self._context = None
+        self.breaches = list()
+        portfolio.add_observer(self)
+
+    @property
+    def rules(self):
+        return tuple(self._rules)
+
+    def add_rule(self, rule):
+        if not isinstance(rule, Rule):
+            raise TypeError("expected rule instance")
+        self._rules.append(rule)
+
+    def observable_update(self, observable):
+        self._context = None
+
+    @property
+    def context(self):
+        if self._context is None:
+            self._context = ComplianceContext(self.portfolio)
+        return self._context
+
+    def check(self):
+        """ Return every breach of the portfolio as it is. """
+        context = self.context
+        return [
+            breach for rule in self._rules for breach in rule.check(context)
+        ]
+
+    def check_trade(self, asset, units, consideration=None):
+        """ Return every breach the portfolio would have after trading,
+            checking only the change the trade makes.
+        """
+        legs = self.portfolio.what_if_trade(asset, units, consideration)
+        context = self.context
+        return [
+            breach
+            for rule in self._rules
+            for breach in rule.check_trade(context, legs)
+        ]
+
+    def is_allowed(self, asset, units, consideration=None):
+        return not self.check_trade(asset, units, consideration)
+
+    def perform(self):
+        self.breaches = self.check()
@@ -0,0 +1,185 @@
+"""
+Execute orders for a portfolio as a single batch.
+
+A Trader collects orders (or target weights, which are turned into
+orders), nets them by asset, simulates a fill for each with slippage
+and commission models and applies every fill inside one batch, so the
+portfolio and its observers are updated once per execution rather than
+twice per order. Cash is settled once per currency.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict, namedtuple
+from .actor import Actor
+from ..assets import Cash
+from ..observable import Observable
+
+
+Order = namedtuple("Order", ["code", "units"])
+
+# price and commission are in the asset's currency
+Fill = namedtuple("Fill", ["code", "units", "price", "commission"])
+
+
+class SlippageModel(ABC):
+    @abstractmethod
+    def get_fill_price(self, asset, units):
+        """ Return the price units of asset are filled at. """
+        raise NotImplementedError()
+
+
+class NoSlippage(SlippageModel):
+    def get_fill_price(self, asset, units):
+        return asset.local_value
+
+
+class ProportionalSlippage(SlippageModel):
+    """ Buy above and sell below the current price by some basis points.
+    """
+
+    def __init__(self, basis_points):
+        self.basis_points = basis_points
+
+    def get_fill_price(self, asset, units):
+        slippage = self.basis_points / 10000.0
+        if units < 0:
+            slippage = -slippage
+        return asset.local_value * (1.0 + slippage)
+
+
+class CommissionModel(ABC):
+    @abstractmethod
+    def get_commission(self, asset, units, price):
+        """ Return the commission charged for a fill. """
+        raise NotImplementedError()
+
+
+class NoCommission(CommissionModel):
+    def get_commission(self, asset, units, price):
+        return 0.0
+
+
+class PercentCommission(CommissionModel):
+    """ A percentage of the traded value, with an optional minimum. """
+
+    def __init__(self, percent, minimum=0.0):
+        self.percent = percent
+        self.minimum = minimum
+
+    def get_commission(self, asset, units, price):
+        commission = abs(units * price) * self.percent / 100.0
+        return max(commission, self.minimum)
+
+
+class PerUnitCommission(CommissionModel):
+    def __init__(self, per_unit):
+        self.per_unit = per_unit
+
+    def get_commission(self, asset, units, price):
+        return abs(units) * self.per_unit
+
+
+def net_orders(orders):
+    """ Sum units by asset code, dropping codes that net to zero. """
+    netted = OrderedDict()
+    for code, units in orders:
+        code = str(code).strip().upper()
+        netted[code] = netted.get(code, 0) + units
+    return [Order(code, units) for code, units in netted.items() if units]
+
+
+class Trader(Actor):
+    """ Fill orders for a portfolio.
+        A strategy (if given) is run when the trader performs and
+        can submit orders or target weights, which are then executed.
+    """
+
+    def __init__(
+        self, portfolio, strategy=None, slippage=None, commission=None
+    ):
+        super().__init__(portfolio, strategy)
+        self._slippage = NoSlippage() if slippage is None else slippage
+        self._commission = NoCommission() if commission is None else commission
+        self._orders = list()
+        self.fills = list()
+
+    @property
+    def orders(self):
+        """ The orders waiting to be executed. """
+        return tuple(self._orders)
+
+    def submit(self, orders):
+        """ Queue orders, as Orders or (asset code, units) pairs. """
+        self._orders.extend(Order(code, units) for code, units in orders)
+
+    def target_weights(self, weights):
+        """ Queue the orders that move the portfolio to target weights,
+            a mapping of asset code to the fraction of the portfolio
+            value it should be worth. Non cash holdings without a
+            weight are sold.
+        """
+        portfolio = self.portfolio
+        context = portfolio.context
+        portfolio_value = portfolio.value
+        base_currency_code = portfolio.base_currency_code
+        weights = {
+            str(code).strip().upper(): weight
+            for code, weight in weights.items()
+        }
+        for code in portfolio.holding_codes():
+            if code not in weights:
+                asset = context.get_asset(code)
+                if not isinstance(asset, Cash):
+                    weights[code] = 0.0
+
+        orders = list()
+        for code, weight in weights.items():
+            asset = context.get_asset(code)
+            currency_pair = asset.currency_code + base_currency_code
+            fx_rate = context.get_rate(currency_pair)
+            unit_value = asset.local_value * fx_rate
+            target_value = weight * portfolio_value
+            current_value = portfolio.get_holding_value(code)
+            units = (target_value - current_value) / unit_value
+            orders.append(Order(code, units))
+        self.submit(orders)
+
+    def execute(self):
+        """ Net and fill the queued orders, applying every fill as a
+            single batch. Return the fills.
+        """
+        portfolio = self.portfolio
+        context = portfolio.context
+        orders = net_orders(self._orders)
+        self._orders = list()
+
+        fills = list()
+        considerations = OrderedDict()
+        for code, units in orders:
+            asset = context.get_asset(code)
+            price = self._slippage.get_fill_price(asset, units)
+            commission = self._commission.get_commission(asset, units, price)
+            fills.append(Fill(code, units, price, commission))
+            currency_code = asset.currency_code
+            considerations[currency_code] = (
+                considerations.get(currency_code, 0.0)
+                - units * price
+                - commission
+            )
+
+        with Observable.batch_updates():
+            for currency_code, consideration in considerations.items():
+                if context.asset_code_exists(currency_code):
+                    cash = context.get_asset(currency_code)
+                else:
+                    cash = Cash(currency_code, context)
+                portfolio.transfer(cash, consideration)
+            for fill in fills:
+                asset = context.get_asset(fill.code)
+                portfolio.transfer(asset, fill.units)
+        self.fills = fills
+        return fills
+
+    def perform(self):
+        if self._strategy is not None:
+            self._strategy.run()
+        self.execute()
@@ -1,5 +1,7 @@
+from .context import MarketContext  # noqa: F401
 from .asset import Asset  # noqa: F401
 from .stock import Stock  # noqa: F401
 from .cash import Cash  # noqa: F401
 from .fx_rates import FxRate  # noqa: F401
-from .portfolio import Holding, Portfolio  # noqa: F401
+from .portfolio import Holding, Portfolio, TradeLeg  # noqa: F401
+from .array_portfolio import ArrayPortfolio  # noqa: F401
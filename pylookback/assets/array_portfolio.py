@@ -0,0 +1,251 @@
+"""
+A columnar alternative to Portfolio for very large books.
+Rather than one Holding object per position, units, local values and
+fx rates are kept in contiguous arrays and the book is valued with a
+single dot product evaluated in C.
+"""
+from array import array
+from itertools import chain
+from math import fsum
+from operator import mul
+from .cash import Cash
+from .fx_rates import FxRate
+from ..observable import synchronized
+from .portfolio import Portfolio
+
+
+class ArrayPortfolio(Portfolio):
+    """ Hold units of assets in columns rather than Holding objects.
+        Asset and fx rate changes are written into the columns in O(1)
+        and the value is computed from the columns when read.
+    """
+
+    def __init__(self, base_currency_code="USD", code=None, context=None):
+        super().__init__(base_currency_code, code=code, context=context)
+        # one row per asset
+        self._rows = dict()
+        self._assets = list()
+        self._units = array("d")
+        self._local_values = array("d")
+        self._fx_indices = array("l")
+        # one entry per currency
+        self._currency_indices = dict()
+        self._currency_pairs = list()
+        self._fx_rates = array("d")
+        # the fx rates each currency's rate is read from, and the
+        # currency columns that depend on each observed pair
+        self._fx_instances = list()
+        self._fx_dependents = dict()
+        # the row holding each currency's cash
+        self._cash_rows = dict()
+
+    @property
+    @synchronized
+    def value(self):
+        local_values = map(mul, self._units, self._local_values)
+        fx_rates = map(self._fx_rates.__getitem__, self._fx_indices)
+        return fsum(map(mul, local_values, fx_rates))
+
+    def _change_holdings(self, asset, units):
+        if isinstance(asset, Portfolio):
+            self._validate_portfolio_holding(asset)
+        self._validate_market(asset)
+        row = self._rows.get(asset.code)
+        if row is not None:
+            self._units[row] += units
+            self.notify_observers()
+            return
+
+        fx_index = self._get_fx_index(asset.currency_code)
+        if isinstance(asset, Cash):
+            self._cash_rows[asset.currency_code] = len(self._assets)
+        self._rows[asset.code] = len(self._assets)
+        self._assets.append(asset)
+        self._units.append(units)
+        self._local_values.append(asset.local_value)
+        self._fx_indices.append(fx_index)
+        asset.add_observer(self)
+        self.notify_observers()
+
+    def _get_fx_index(self, currency_code):
+        """ Return the column for a currency, observing its fx rate. """
+        fx_index = self._currency_indices.get(currency_code)
+        if fx_index is not None:
+            return fx_index
+
+        currency_pair = currency_code + self.base_currency_code
+        context = self._context
+        rate = context.get_rate(currency_pair)
+        fx_index = len(self._currency_pairs)
+        self._observe_rates(context.get_observable_instances(currency_pair))
+        self._currency_indices[currency_code] = fx_index
+        self._currency_pairs.append(currency_pair)
+        self._fx_rates.append(rate)
+        return fx_index
+
+    def _observe_rates(self, fx_instances):
+        """ Observe the fx rates the next currency column depends on. """
+        fx_index = len(self._fx_instances)
+        fx_instances = tuple(fx_instances)
+        self._fx_instances.append(fx_instances)
+        for fx_instance in fx_instances:
+            observed_pair = fx_instance.currency_pair
+            self._fx_dependents.setdefault(observed_pair, []).append(fx_index)
+            fx_instance.add_observer(self)
+        if len(fx_instances) > 1:
+            # the path may change as pairs are created or released
+            self._context._add_path_observer(self)
+
+    def _paths_changed(self):
+        """ Pairs were created or released in our context, so observe
+            the rates each currency column now depends on and re-read
+            the columns.
+        """
+        context = self._context
+        column_instances = list()
+        for fx_index, currency_pair in enumerate(self._currency_pairs):
+            try:
+                fx_instances = tuple(
+                    context.get_observable_instances(currency_pair)
+                )
+            except ValueError:
+                # no path for now, keep the rates already observed
+                fx_instances = self._fx_instances[fx_index]
+            column_instances.append(fx_instances)
+        if column_instances == self._fx_instances:
+            return
+
+        old_instances = set(chain.from_iterable(self._fx_instances))
+        self._fx_instances = list()
+        self._fx_dependents = dict()
+        for fx_instances in column_instances:
+            self._observe_rates(fx_instances)
+        observed = set(chain.from_iterable(column_instances))
+        for fx_instance in old_instances - observed:
+            fx_instance.remove_observer(self)
+        for fx_index, currency_pair in enumerate(self._currency_pairs):
+            self._fx_rates[fx_index] = context.get_rate(currency_pair)
+        self.notify_observers()
+
+    def observable_update(self, observable):
+        self._update_column(observable)
+        self.notify_observers()
+
+    def observable_batch_update(self, observables):
+        for observable in observables:
+            self._update_column(observable)
+        self.notify_observers()
+
+    def _update_column(self, observable):
+        if isinstance(observable, FxRate):
+            self._update_fx_rates(observable.currency_pair)
+        else:
+            row = self._rows[observable.code]
+            self._local_values[row] = observable.local_value
+
+    def _update_fx_rates(self, observed_pair):
+        for fx_index in self._fx_dependents.get(observed_pair, ()):
+            currency_pair = self._currency_pairs[fx_index]
+            self._fx_rates[fx_index] = self._context.get_rate(currency_pair)
+
+    def _rebind(self, original, copy):
+        """ Read a fork's copy of an asset or fx rate instead. """
+        original.remove_observer(self)
+        copy.add_observer(self)
+        if isinstance(original, FxRate):
+            self._fx_instances = [
+                tuple(
+                    copy if fx_instance is original else fx_instance
+                    for fx_instance in fx_instances
+                )
+                for fx_instances in self._fx_instances
+            ]
+        else:
+            self._assets[self._rows[original.code]] = copy
+
+    def _revalue(self):
+        """ Re-read every local value and fx rate. """
+        for row, asset in enumerate(self._assets):
+            self._local_values[row] = asset.local_value
+        for fx_index, currency_pair in enumerate(self._currency_pairs):
+            self._fx_rates[fx_index] = self._context.get_rate(currency_pair)
+
+    def _snapshot_holdings(self):
+        for code, row in self._rows.items():
+            units = self._units[row]
+            local_value = units * self._local_values[row]
+            fx_rate = self._fx_rates[self._fx_indices[row]]
+            yield code, units, local_value, local_value * fx_rate
+
+    def _restore_holdings(self, holdings):
+        # local values are per unit and read from the restored assets
+        for asset, units, _, _ in holdings:
+            fx_index = self._get_fx_index(asset.currency_code)
+            if isinstance(asset, Cash):
+                self._cash_rows[asset.currency_code] = len(self._assets)
+            self._rows[asset.code] = len(self._assets)
+            self._assets.append(asset)
+            self._units.append(units)
+            self._local_values.append(asset.local_value)
+            self._fx_indices.append(fx_index)
+            asset.add_observer(self)
+
+    @synchronized
+    def local_exposures(self):
+        """ Sum the local value columns by currency. """
+        by_currency = [[] for _ in self._currency_pairs]
+        local_values = map(mul, self._units, self._local_values)
+        for fx_index, local_value in zip(self._fx_indices, local_values):
+            by_currency[fx_index].append(local_value)
+        return {
+            currency_pair[:3]: fsum(values)
+            for currency_pair, values in zip(
+                self._currency_pairs, by_currency
+            )
+        }
+
+    def currency_exposures(self):
+        local_exposures = self.local_exposures()
+        return {
+            currency_pair[:3]: local_exposures[currency_pair[:3]] * fx_rate
+            for currency_pair, fx_rate in zip(
+                self._currency_pairs, self._fx_rates
+            )
+        }
+
+    def get_currency_exposure(self, currency_code):
+        currency_code = str(currency_code).strip().upper()
+        return self.currency_exposures().get(currency_code, 0)
+
+    @synchronized
+    def cash_by_currency(self):
+        return {
+            currency_code: self._units[row]
+            for currency_code, row in self._cash_rows.items()
+        }
+
+    def holding_codes(self):
+        return tuple(self._rows)
+
+    def get_holding_value(self, asset_code):
+        asset_code = str(asset_code).strip().upper()
+        row = self._rows.get(asset_code)
+        if row is None:
+            return 0
+        fx_rate = self._fx_rates[self._fx_indices[row]]
+        return self._units[row] * self._local_values[row] * fx_rate
+
+    def get_holding_units(self, asset_code):
+        asset_code = str(asset_code).strip().upper()
+        row = self._rows.get(asset_code)
+        if row is None:
+            return 0
+        return self._units[row]
+
+    def __str__(self):
+        return "ArrayPortfolio -> " + "\n".join(
+            [
+                asset.code + ": " + str(units)
+                for asset, units in zip(self._assets, self._units)
+            ]
+        )
@@ -1,10 +1,10 @@
-from weakref import WeakSet
-from abc import ABC, abstractmethod
-from ..observable import Observable
+from abc import ABCMeta, abstractmethod
+from .context import MarketContext
+from ..observable import Observable, synchronized
 from ..descriptors import String, UnsignedReal, StringOfFixedSize
 
 
-class Asset(ABC, Observable):
+class Asset(Observable, metaclass=ABCMeta):
     """ Portfolios consist of holdings (units of some asset).
         All assets should have:
         - a unique code (string)
@@ -13,44 +13,80 @@ class Asset(ABC, Observable):
         - a local value (or value in quoted currency)
 
         Code and currency_code are static and should not change
-        over the asset's life.
+        over the asset's life. Codes are unique within the asset's
+        market context (see MarketContext), the default unless one
+        is given.
     """
 
-    _instances = WeakSet()
+    __slots__ = (
+        "_code_value",
+        "_currency_code_value",
+        "_price_value",
+        "_local_value",
+        "_context",
+    )
 
     # descriptors
     _code = String("_code")
     _currency_code = StringOfFixedSize("_currency_code", size=3)
     _price = UnsignedReal("_price")
 
-    @classmethod
-    def _register_asset(cls, asset):
-        cls._instances.add(asset)
-
+    # lookups in the default context, see MarketContext
     @classmethod
     def registered_codes(cls):
-        return sorted([asset.code for asset in cls._instances])
+        return MarketContext.default().registered_codes()
 
     @classmethod
     def asset_code_exists(cls, code):
-        return code in cls.registered_codes()
+        return MarketContext.default().asset_code_exists(code)
 
     @classmethod
     def get_asset_by_code(cls, code):
-        for asset in cls._instances:
-            if asset.code == code:
-                return asset
-        raise ValueError("code %s does not exist" % code)
+        return MarketContext.default().get_asset(code)
+
+    @classmethod
+    def update_prices(cls, prices):
+        """ Set prices from a mapping of asset code to price.
+            Observers are notified once the whole batch is applied.
+        """
+        MarketContext.default().update_prices(prices)
+
+    @classmethod
+    def _restore(cls, code, currency_code, price, local_value, context=None):
+        """ Recreate a registered asset from a snapshot, skipping
+            validation and revaluation (see snapshot.py).
+        """
+        asset = cls.__new__(cls)
+        Observable.__init__(asset)
+        asset._code_value = code
+        asset._currency_code_value = currency_code
+        asset._price_value = price
+        asset._local_value = local_value
+        asset._context = MarketContext.resolve(context)
+        asset._context._register_asset(asset)
+        return asset
+
+    def _fork(self, context):
+        """ Copy this asset into a fork of its context. """
+        return self._restore(
+            self.code,
+            self.currency_code,
+            self.price,
+            self.local_value,
+            context,
+        )
 
     def _validate_code(self, code):
         """ Every asset must have a unique string code. """
-        if code in self.registered_codes():
-            raise ValueError("Code %s is already in use" % code)
         self._code = code
-        self._register_asset(self)
+        if self._context.asset_code_exists(self._code):
+            raise ValueError("Code %s is already in use" % code)
+        self._context._register_asset(self)
 
-    def __init__(self, code, price, currency_code):
+    @synchronized
+    def __init__(self, code, price, currency_code, context=None):
         super().__init__()
+        self._context = MarketContext.resolve(context)
         self._validate_code(code)
         self._currency_code = currency_code
         self._local_value = None
@@ -65,6 +101,10 @@ class Asset(ABC, Observable):
     def currency_code(self):
         return self._currency_code
 
+    @property
+    def context(self):
+        return self._context
+
     @property
     def local_value(self):
         return self._local_value
@@ -75,6 +115,7 @@ class Asset(ABC, Observable):
         return self._price
 
     @price.setter
+    @synchronized
     def price(self, price):
         """ Call the revalue method when price changes. """
         self._price = price
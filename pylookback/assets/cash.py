@@ -4,9 +4,11 @@ from .asset import Asset
 class Cash(Asset):
     """ The local value for cash should always be 1.0. """
 
-    def __init__(self, code):
+    __slots__ = ()
+
+    def __init__(self, code, context=None):
         super().__init__(
-            code=code, price=1.0, currency_code=code,
+            code=code, price=1.0, currency_code=code, context=context,
         )
         self._price = self._local_value = 1.0
 
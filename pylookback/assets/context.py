@@ -0,0 +1,394 @@
+"""
+Markets: the registries that asset codes and currency pairs are
+looked up in, together with the rate matrix and cross rate paths
+resolved from them.
+
+Every asset, fx rate and portfolio belongs to a MarketContext, the
+default context unless another is given. The class level lookups
+(e.g. Asset.get_asset_by_code and FxRate.get) use the default context.
+Other contexts are independent markets in the same process, so the
+same codes can be used in each.
+
+Forking a context gives a scenario that reads through to its parent,
+so it costs nothing to create. Setting a price or rate in the fork
+copies just that asset or rate into it, leaving the parent as it was:
+
+    scenario = MarketContext.default().fork()
+    book = Portfolio("USD", context=scenario)
+    book.transfer(scenario.get_asset("AAPL US"), 100)
+    scenario.set_price("AAPL US", 90.0)
+
+Until then the fork sees every change made in its parent. Holdings in
+the fork (or its own forks) that valued the parent's asset or rate move
+over to the copy when it is made.
+"""
+from collections import deque
+from weakref import WeakSet, ref
+from .currency_pairs import (
+    get_inverse_pair,
+    is_equivalent_pair,
+    split_pair,
+    validate_pair,
+)
+from .rate_matrix import RateMatrix
+from ..observable import Observable, synchronized
+from ..registry import Registry
+
+
+class MarketContext:
+    """ Asset and fx rate registries, the rate matrix and cached cross
+        rate paths. A fork looks up anything it does not hold itself in
+        its parent.
+    """
+
+    _default = None
+
+    def __init__(self, parent=None):
+        if parent is not None and not isinstance(parent, MarketContext):
+            raise TypeError("expected market context")
+        self._parent = parent
+        self._forks = WeakSet()
+        if parent is not None:
+            parent._forks.add(self)
+        self._assets = Registry()
+        self._fx_rates = Registry(on_release=self._make_release_callback())
+        # the assets and rates copied into a fork, held here so that the
+        # scenario outlives the holdings that value them
+        self._copies = list()
+        self._matrix = RateMatrix()
+        # cross rate paths are cached until pairs are created or
+        # released, cross rates (and in a fork, the parent's rates) are
+        # held in the matrix until a rate they depend on changes
+        self._paths = dict()
+        self._dependents = dict()
+        # holdings and portfolios observing the legs of a cross rate,
+        # which observe the legs afresh when paths change
+        self._path_observers = WeakSet()
+
+    @staticmethod
+    def default():
+        """ The context used wherever one is not given. """
+        return MarketContext._default
+
+    @staticmethod
+    def resolve(context):
+        """ Return context, or the default context for None. """
+        if context is None:
+            return MarketContext._default
+        if not isinstance(context, MarketContext):
+            raise TypeError("expected market context")
+        return context
+
+    @property
+    def parent(self):
+        return self._parent
+
+    def fork(self):
+        """ Return a scenario that reads through to this context. """
+        return MarketContext(self)
+
+    def _chain(self):
+        """ Generate this context and its ancestors. """
+        context = self
+        while context is not None:
+            yield context
+            context = context._parent
+
+    def _make_release_callback(self):
+        # hold the context weakly, the registry belongs to it
+        context_ref = ref(self)
+
+        def callback(currency_pair):
+            context = context_ref()
+            if context is not None:
+                context._rates_released(currency_pair)
+
+        return callback
+
+    def clear(self):
+        """ Release every asset code and currency pair registered in
+            this context (but not its parent).
+        """
+        self._copies = list()
+        self._assets.clear()
+        self._fx_rates.clear()
+
+    # assets
+    def _find_asset(self, code):
+        asset = self._assets.get(code)
+        if asset is None and self._parent is not None:
+            return self._parent._find_asset(code)
+        return asset
+
+    def _register_asset(self, asset):
+        self._assets.register(asset.code, asset)
+
+    def registered_codes(self):
+        if self._parent is None:
+            return list(self._assets.keys())
+        codes = set()
+        for context in self._chain():
+            codes.update(context._assets.keys())
+        return sorted(codes)
+
+    def asset_code_exists(self, code):
+        return self._find_asset(code) is not None
+
+    def get_asset(self, code):
+        asset = self._find_asset(code)
+        if asset is None:
+            raise ValueError("code %s does not exist" % code)
+        return asset
+
+    def assets(self):
+        """ Generate the assets registered in this context. """
+        return self._assets.values()
+
+    def set_price(self, code, price):
+        """ Set a price, in a fork copying the parent's asset first. """
+        asset = self.get_asset(code)
+        if asset._context is not self:
+            asset = self._copy(asset, code, MarketContext._find_asset)
+        asset.price = price
+
+    def update_prices(self, prices):
+        """ Set prices from a mapping of asset code to price.
+            Observers are notified once the whole batch is applied.
+        """
+        with Observable.batch_updates():
+            for code, price in prices.items():
+                self.set_price(code, price)
+
+    # fx rates
+    def _find_fx_rate(self, currency_pair):
+        fx_rate = self._fx_rates.get(currency_pair)
+        if fx_rate is None and self._parent is not None:
+            return self._parent._find_fx_rate(currency_pair)
+        return fx_rate
+
+    def _register_fx_rate(self, fx_rate):
+        currency_pair = fx_rate.currency_pair
+        if self._find_fx_rate(currency_pair) is not None:
+            raise ValueError("%s already created" % currency_pair)
+        inverse_pair = get_inverse_pair(currency_pair)
+        if self._find_fx_rate(inverse_pair) is not None:
+            raise ValueError("%s inverse pair already created" % inverse_pair)
+        self._add_fx_rate(fx_rate)
+
+    def _add_fx_rate(self, fx_rate):
+        currency_pair = fx_rate.currency_pair
+        self._fx_rates.register(currency_pair, fx_rate)
+        self._matrix.set_rate(*split_pair(currency_pair), rate=fx_rate.rate)
+        self.clear_paths()
+
+    def currency_pair_exists(self, currency_pair):
+        """ True where an instance exists for exactly this pair. """
+        return self._find_fx_rate(currency_pair) is not None
+
+    def fx_rates(self):
+        """ Generate the fx rates registered in this context. """
+        return self._fx_rates.values()
+
+    def get_fx_rate(self, currency_pair):
+        validate_pair(currency_pair)
+        fx_rate = self._find_fx_rate(currency_pair)
+        if fx_rate is None:
+            raise ValueError("%s instance doesn't exist" % currency_pair)
+        return fx_rate
+
+    def set_rate(self, currency_pair, rate):
+        """ Set a rate, in a fork copying the parent's rate first. """
+        fx_rate = self.get_fx_rate(currency_pair)
+        if fx_rate._context is not self:
+            fx_rate = self._copy(
+                fx_rate, currency_pair, MarketContext._find_fx_rate
+            )
+        fx_rate.rate = rate
+
+    def update_rates(self, rates):
+        """ Set rates from a mapping of currency pair to rate.
+            Observers are notified once the whole batch is applied.
+        """
+        with Observable.batch_updates():
+            for currency_pair, rate in rates.items():
+                self.set_rate(currency_pair, rate)
+
+    def _copy(self, original, key, find):
+        """ Copy an asset or fx rate from a parent into this context.
+            Observers in this context (or its forks) that now find the
+            copy under key are moved over to it.
+        """
+        copy = original._fork(self)
+        self._copies.append(copy)
+        for observer in list(original._observers):
+            context = getattr(observer, "_context", None)
+            if context is not None and find(context, key) is copy:
+                observer._rebind(original, copy)
+        return copy
+
+    @synchronized
+    def get_rate(self, currency_pair):
+        validate_pair(currency_pair)
+        currency_pair = currency_pair.strip().upper()
+
+        if is_equivalent_pair(currency_pair):
+            return 1.0
+
+        # direct and inverse pairs and resolved cross rates
+        rate = self._matrix.get(currency_pair[:3], currency_pair[3:])
+        if rate == rate:
+            return rate
+        return self._resolve_rate(currency_pair)
+
+    def get_rate_cell(self, currency_pair):
+        """ Return a (row, column) such that row[column] is the current
+            rate for this pair, or nan if it has not been resolved since
+            a rate it depends on changed (call get_rate to resolve it).
+        """
+        validate_pair(currency_pair)
+        currency_pair = currency_pair.strip().upper()
+        return self._matrix.get_cell(*split_pair(currency_pair))
+
+    def _resolve_rate(self, currency_pair):
+        """ Read a parent's rate into a fork or resolve a cross rate. """
+        for pair in (currency_pair, get_inverse_pair(currency_pair)):
+            fx_rate = self._find_fx_rate(pair)
+            if fx_rate is not None:
+                self._matrix.set_rate(*split_pair(pair), rate=fx_rate.rate)
+                return self._matrix.get(*split_pair(currency_pair))
+
+        rate = 1.0
+        for leg_pair, inverted in self._get_path(currency_pair):
+            leg_rate = self._find_fx_rate(leg_pair).rate
+            rate = rate / leg_rate if inverted else rate * leg_rate
+        self._matrix.set_rate(*split_pair(currency_pair), rate=rate)
+        return rate
+
+    def _get_path(self, currency_pair):
+        """ Return the legs of the shortest path between the currencies
+            as (currency pair, inverted) tuples.
+        """
+        path = self._paths.get(currency_pair)
+        if path is not None:
+            return path
+
+        ccy1, ccy2 = split_pair(currency_pair)
+        path = self._find_path(ccy1, ccy2)
+        if path is None:
+            raise ValueError("%s rate not available" % currency_pair)
+        self._paths[currency_pair] = path
+        for leg_pair, _ in path:
+            self._dependents.setdefault(leg_pair, set()).add(currency_pair)
+        return path
+
+    def _get_pairs(self):
+        if self._parent is None:
+            return self._fx_rates.keys()
+        pairs = set()
+        for context in self._chain():
+            pairs.update(context._fx_rates.keys())
+        return sorted(pairs)
+
+    def _find_path(self, ccy1, ccy2):
+        """ Breadth first search through the available pairs. """
+        graph = dict()
+        for leg_pair in self._get_pairs():
+            base, quote = split_pair(leg_pair)
+            graph.setdefault(base, []).append((quote, leg_pair, False))
+            graph.setdefault(quote, []).append((base, leg_pair, True))
+
+        previous = {ccy1: None}
+        queue = deque([ccy1])
+        while queue:
+            currency = queue.popleft()
+            if currency == ccy2:
+                break
+            for neighbour, leg_pair, inverted in graph.get(currency, ()):
+                if neighbour not in previous:
+                    previous[neighbour] = (currency, leg_pair, inverted)
+                    queue.append(neighbour)
+        else:
+            return None
+
+        path = []
+        currency = ccy2
+        while previous[currency] is not None:
+            currency, leg_pair, inverted = previous[currency]
+            path.append((leg_pair, inverted))
+        return tuple(reversed(path))
+
+    def clear_paths(self):
+        """ Pairs have been created or released so paths may change.
+            Observers of cross rates re-resolve the legs they observe.
+        """
+        for cross_pair in self._paths:
+            self._matrix.clear_rate(*split_pair(cross_pair))
+        self._paths.clear()
+        self._dependents.clear()
+        for observer in list(self._path_observers):
+            observer._paths_changed()
+        for fork in self._forks:
+            fork.clear_paths()
+
+    def _add_path_observer(self, observer):
+        """ Call observer._paths_changed whenever paths may change. """
+        self._path_observers.add(observer)
+
+    def _rates_released(self, currency_pair):
+        self._matrix.clear_rate(*split_pair(currency_pair))
+        self.clear_paths()
+        for fork in self._forks:
+            fork._parent_rate_changed(currency_pair)
+
+    def _rate_changed(self, fx_rate):
+        """ A rate registered in this context has changed. """
+        currency_pair = fx_rate.currency_pair
+        matrix = self._matrix
+        matrix.set_rate(currency_pair[:3], currency_pair[3:], fx_rate.rate)
+        for cross_pair in self._dependents.get(currency_pair, ()):
+            matrix.clear_rate(cross_pair[:3], cross_pair[3:])
+        if self._forks:
+            for fork in self._forks:
+                fork._parent_rate_changed(currency_pair)
+
+    def _parent_rate_changed(self, currency_pair):
+        """ Forget a parent's rate unless this context has its own. """
+        if currency_pair in self._fx_rates:
+            return
+        matrix = self._matrix
+        matrix.clear_rate(currency_pair[:3], currency_pair[3:])
+        for cross_pair in self._dependents.get(currency_pair, ()):
+            matrix.clear_rate(cross_pair[:3], cross_pair[3:])
+        for fork in self._forks:
+            fork._parent_rate_changed(currency_pair)
+
+    def get_observable_instance(self, currency_pair):
+        """ Return an instance representing either the
+            currency pair (if available) or its inverse.
+        """
+        validate_pair(currency_pair)
+        for pair in (currency_pair, get_inverse_pair(currency_pair)):
+            fx_rate = self._find_fx_rate(pair)
+            if fx_rate is not None:
+                return fx_rate
+        raise ValueError("%s instance doesn't exist" % currency_pair)
+
+    def get_observable_instances(self, currency_pair):
+        """ Return every instance that the rate for this pair depends
+            on, i.e. the pair, its inverse or each leg of a cross rate.
+        """
+        validate_pair(currency_pair)
+        currency_pair = currency_pair.strip().upper()
+        if is_equivalent_pair(currency_pair):
+            return []
+        for pair in (currency_pair, get_inverse_pair(currency_pair)):
+            fx_rate = self._find_fx_rate(pair)
+            if fx_rate is not None:
+                return [fx_rate]
+        return [
+            self._find_fx_rate(leg_pair)
+            for leg_pair, _ in self._get_path(currency_pair)
+        ]
+
+
+MarketContext._default = MarketContext()
@@ -0,0 +1,45 @@
+"""
+Helpers for six character currency pair codes, e.g. 'AUDUSD'.
+"""
+
+
+def validate_pair(currency_pair):
+    if not isinstance(currency_pair, str):
+        raise TypeError("expected str")
+    currency_pair = currency_pair.strip()
+    if len(currency_pair) != 6:
+        raise ValueError("expected a 6 character code")
+
+
+def split_pair(currency_pair):
+    """ Return two individual components of the pair.
+    >>> split_pair("AUDUSD")
+    ('AUD', 'USD')
+    """
+    validate_pair(currency_pair)
+    ccy1 = currency_pair[:3]
+    ccy2 = currency_pair[3:]
+    return ccy1, ccy2
+
+
+def is_equivalent_pair(currency_pair):
+    """ Returns True where we expect the rate to be static.
+        For example, AUDAUD = 1.0, USDUSD = 1.0
+    >>> is_equivalent_pair("AUDAUD")
+    True
+    >>> is_equivalent_pair("AUDUSD")
+    False
+    """
+    ccy1, ccy2 = split_pair(currency_pair)
+    if ccy1 == ccy2:
+        return True
+    return False
+
+
+def get_inverse_pair(currency_pair):
+    """ Returns the inverse of some currency pair.
+    >>> get_inverse_pair("AUDUSD")
+    'USDAUD'
+    """
+    ccy1, ccy2 = split_pair(currency_pair)
+    return ccy2 + ccy1
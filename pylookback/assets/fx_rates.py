@@ -4,86 +4,85 @@ However, portfolios may consist of assets denominated in different currencies.
 We'll need to value all assets in a chosen base currency.
 To do this we need to keep track of FX rates.
 """
-from weakref import WeakValueDictionary
-from ..observable import Observable
+from ..observable import Observable, synchronized
+from .context import MarketContext
+from .currency_pairs import (  # noqa: F401
+    get_inverse_pair,
+    is_equivalent_pair,
+    split_pair,
+    validate_pair,
+)
 from ..descriptors import StringOfFixedSize, UnsignedReal
 
 
-def validate_pair(currency_pair):
-    if not isinstance(currency_pair, str):
-        raise TypeError("expected str")
-    currency_pair = currency_pair.strip()
-    if len(currency_pair) != 6:
-        raise ValueError("expected a 6 character code")
-
-
-def split_pair(currency_pair):
-    """ Return two individual components of the pair.
-    >>> split_pair("AUDUSD")
-    ('AUD', 'USD')
-    """
-    validate_pair(currency_pair)
-    ccy1 = currency_pair[:3]
-    ccy2 = currency_pair[3:]
-    return ccy1, ccy2
-
-
-def is_equivalent_pair(currency_pair):
-    """ Returns True where we expect the rate to be static.
-        For example, AUDAUD = 1.0, USDUSD = 1.0
-    >>> is_equivalent_pair("AUDAUD")
-    True
-    >>> is_equivalent_pair("AUDUSD")
-    False
-    """
-    ccy1, ccy2 = split_pair(currency_pair)
-    if ccy1 == ccy2:
-        return True
-    return False
-
-
-def get_inverse_pair(currency_pair):
-    """ Returns the inverse of some currency pair.
-    >>> get_inverse_pair("AUDUSD")
-    'USDAUD'
-    """
-    ccy1, ccy2 = split_pair(currency_pair)
-    return ccy2 + ccy1
-
-
 class FxRate(Observable):
-    """ Keep track of fx rates to value assets in different currencies. """
+    """ Keep track of fx rates to value assets in different currencies.
+        Pairs that have not been created directly (or as an inverse)
+        are resolved as cross rates along the shortest path through
+        the available pairs, e.g. EURJPY from EURUSD and USDJPY.
+
+        Every known rate is also written into a dense rate matrix so
+        that holdings can read their conversion rate from a cached
+        cell rather than looking up the pair on every revaluation.
+        Pairs, paths and the matrix are kept by the rate's market
+        context (see MarketContext), the default unless one is given.
+    """
 
-    _instances = WeakValueDictionary()
+    __slots__ = ("_currency_pair_value", "_rate_value", "_context")
 
     # descriptors
     _currency_pair = StringOfFixedSize("_currency_pair", size=6)
     _rate = UnsignedReal("_rate")
 
-    def __init__(self, currency_pair, rate):
+    @synchronized
+    def __init__(self, currency_pair, rate, context=None):
         super().__init__()
         if not isinstance(currency_pair, str):
             raise TypeError("expected str")
         currency_pair = currency_pair.strip().upper()
 
+        self._context = MarketContext.resolve(context)
         self._currency_pair = currency_pair
         self.rate = rate
+        self._context._register_fx_rate(self)
 
-        if currency_pair in self._instances:
-            raise ValueError("%s already created" % currency_pair)
+    @classmethod
+    def _restore(cls, currency_pair, rate, context=None):
+        """ Recreate a registered rate from a snapshot, skipping
+            validation. Call clear_paths on the context once every rate
+            is restored.
+        """
+        context = MarketContext.resolve(context)
+        fx_rate = cls.__new__(cls)
+        Observable.__init__(fx_rate)
+        fx_rate._currency_pair_value = currency_pair
+        fx_rate._rate_value = rate
+        fx_rate._context = context
+        context._fx_rates.register(currency_pair, fx_rate)
+        context._matrix.set_rate(*split_pair(currency_pair), rate=rate)
+        return fx_rate
+
+    def _fork(self, context):
+        """ Copy this rate into a fork of its context. """
+        fx_rate = self._restore(self._currency_pair, self._rate, context)
+        context.clear_paths()
+        return fx_rate
 
-        inverse_pair = get_inverse_pair(currency_pair)
-        if inverse_pair in self._instances:
-            raise ValueError("%s inverse pair already created" % inverse_pair)
-        self._instances[currency_pair] = self
+    @property
+    def context(self):
+        return self._context
 
     @property
     def rate(self):
         return self._rate
 
     @rate.setter
+    @synchronized
     def rate(self, rate):
         self._rate = rate
+        context = self._context
+        if context._fx_rates.get(self._currency_pair) is self:
+            context._rate_changed(self)
         self.notify_observers()
 
     @property
@@ -91,46 +90,47 @@ class FxRate(Observable):
         """ This is read only. """
         return self._currency_pair
 
+    # lookups in the default context, see MarketContext
     @classmethod
     def get(cls, currency_pair):
-        validate_pair(currency_pair)
-        currency_pair = currency_pair.strip().upper()
-
-        if is_equivalent_pair(currency_pair):
-            return 1.0
+        return MarketContext.default().get_rate(currency_pair)
 
-        fx = cls._instances.get(currency_pair)
-        if fx is not None:
-            return fx.rate
+    @classmethod
+    def get_rate_cell(cls, currency_pair):
+        """ Return a (row, column) such that row[column] is the current
+            rate for this pair, or nan if a cross rate has not been
+            resolved since a leg changed (call get to resolve it).
+        """
+        return MarketContext.default().get_rate_cell(currency_pair)
 
-        inverse_pair = get_inverse_pair(currency_pair)
-        fx = cls._instances.get(inverse_pair)
-        if fx is not None:
-            return 1 / fx.rate
+    @classmethod
+    def update_rates(cls, rates):
+        """ Set rates from a mapping of currency pair to rate.
+            Observers are notified once the whole batch is applied.
+        """
+        MarketContext.default().update_rates(rates)
 
-        raise ValueError("%s rate not available" % currency_pair)
+    @classmethod
+    def currency_pair_exists(cls, currency_pair):
+        """ True where an instance exists for exactly this pair. """
+        return MarketContext.default().currency_pair_exists(currency_pair)
 
     @classmethod
     def get_instance(cls, currency_pair):
-        validate_pair(currency_pair)
-        instance = cls._instances.get(currency_pair)
-        if instance is None:
-            raise ValueError("%s instance doesn't exist" % currency_pair)
-        return instance
+        return MarketContext.default().get_fx_rate(currency_pair)
 
     @classmethod
     def get_observable_instance(cls, currency_pair):
         """ Return an instance representing either the
             currency pair (if available) or its inverse.
         """
-        validate_pair(currency_pair)
-        instance = cls._instances.get(currency_pair)
-        if instance is not None:
-            return instance
-
-        inverse_pair = get_inverse_pair(currency_pair)
-        instance = cls._instances.get(inverse_pair)
-        if instance is not None:
-            return instance
+        return MarketContext.default().get_observable_instance(currency_pair)
 
-        raise ValueError("%s instance doesn't exist" % currency_pair)
+    @classmethod
+    def get_observable_instances(cls, currency_pair):
+        """ Return every instance that the rate for this pair depends
+            on, i.e. the pair, its inverse or each leg of a cross rate.
+        """
+        return MarketContext.default().get_observable_instances(
+            currency_pair
+        )
@@ -1,33 +1,108 @@
+from collections import OrderedDict, namedtuple
+from math import fsum
 from numbers import Real
+from operator import mul
 from .asset import Asset
 from .cash import Cash
-from .fx_rates import FxRate, is_equivalent_pair
-from ..observable import Observable
+from .context import MarketContext
+from ..graph import depends_on
+from ..observable import Observable, synchronized
+from ..summation import RunningSum
 from ..descriptors import SignedReal, StringOfFixedSize
 
 
+# the change one side of a trade makes to a portfolio, with the value
+# in the portfolio's base currency
+TradeLeg = namedtuple(
+    "TradeLeg", ["code", "currency_code", "units", "value", "cash"]
+)
+
+
 class Holding(Observable):
     """ Hold units in some asset.
         The base currency code defines the currency in which this holding
         will be valued.
+
+        Rates are read from the holding's market context, by default
+        the asset's.
+
+        A lazy holding is marked dirty when its asset or fx rates change
+        and is revalued when its value is next read. Observers are only
+        notified when a clean holding becomes dirty.
     """
 
+    __slots__ = (
+        "_asset",
+        "_asset_code",
+        "_asset_currency_code",
+        "_base_currency_code_value",
+        "_currency_pair",
+        "_fx_row",
+        "_fx_col",
+        "_fx_instances",
+        "_local_currency_value",
+        "_base_currency_value",
+        "_units_value",
+        "_lazy",
+        "_dirty",
+        "_context",
+    )
+
     _units = SignedReal("_units")
     _base_currency_code = StringOfFixedSize("_base_currency_code", size=3)
 
-    def __init__(self, asset, units, base_currency_code):
+    def __init__(
+        self, asset, units, base_currency_code, lazy=False, context=None
+    ):
         super().__init__()
         if not isinstance(asset, Asset):
             raise TypeError("expected asset")
+        if context is None:
+            context = asset.context
+        self._context = MarketContext.resolve(context)
         self._asset = asset
         self._asset_code = asset.code
         self._asset_currency_code = asset.currency_code
         self._base_currency_code = base_currency_code
-        self._observe_components()
         self._currency_pair = asset.currency_code + base_currency_code
+        self._observe_components()
+        self._fx_row, self._fx_col = self._context.get_rate_cell(
+            self._currency_pair
+        )
         self._local_currency_value = self._base_currency_value = None
+        self._lazy = lazy
+        self._dirty = False
         self.units = units
 
+    @classmethod
+    def _restore(cls, asset, units, portfolio, fx, local_value, base_value):
+        """ Recreate a holding with the values cached in a snapshot,
+            without revaluing it (see snapshot.py). fx is the currency
+            pair, its rate cell and the fx rates to observe, which are
+            shared by every holding in that currency.
+        """
+        holding = cls.__new__(cls)
+        Observable.__init__(holding)
+        currency_pair, (fx_row, fx_col), fx_instances = fx
+        holding._asset = asset
+        holding._asset_code = asset.code
+        holding._asset_currency_code = currency_pair[:3]
+        holding._base_currency_code_value = currency_pair[3:]
+        holding._currency_pair = currency_pair
+        holding._fx_row = fx_row
+        holding._fx_col = fx_col
+        holding._units_value = units
+        holding._local_currency_value = local_value
+        holding._base_currency_value = base_value
+        holding._lazy = portfolio.lazy
+        holding._dirty = False
+        holding._context = portfolio.context
+        holding._fx_instances = ()
+        asset.add_observer(holding)
+        holding._observe_rates(fx_instances)
+        holding.add_observer(portfolio)
+        return holding
+
     @property
     def units(self):
         return self._units
@@ -35,23 +110,84 @@ class Holding(Observable):
     @units.setter
     def units(self, units):
         self._units = units
-        self._revalue()
+        self._changed()
 
     def _observe_components(self):
         self._asset.add_observer(self)
-        currency_pair = self.asset_currency_code + self.base_currency_code
-        if not is_equivalent_pair(currency_pair):
-            fx_instance = FxRate.get_observable_instance(currency_pair)
+        self._fx_instances = ()
+        self._observe_rates(
+            self._context.get_observable_instances(self._currency_pair)
+        )
+
+    def _observe_rates(self, fx_instances):
+        """ Observe the fx rates our rate depends on, i.e. the pair,
+            its inverse or every leg along the path of a cross rate.
+            Return True if they differ from those observed before.
+        """
+        fx_instances = tuple(fx_instances)
+        old_instances = self._fx_instances
+        for fx_instance in old_instances:
+            if fx_instance not in fx_instances:
+                fx_instance.remove_observer(self)
+        for fx_instance in fx_instances:
             fx_instance.add_observer(self)
+        self._fx_instances = fx_instances
+        if len(fx_instances) > 1:
+            # the path may change as pairs are created or released
+            self._context._add_path_observer(self)
+        return fx_instances != old_instances
+
+    def _paths_changed(self):
+        """ Pairs were created or released in our context, so a cross
+            rate may now be read from a different set of rates.
+        """
+        try:
+            fx_instances = self._context.get_observable_instances(
+                self._currency_pair
+            )
+        except ValueError:
+            # no path for now, keep the rates already observed
+            return
+        if self._observe_rates(fx_instances):
+            self._changed()
+
+    def _rebind(self, original, copy):
+        """ Value a fork's copy of our asset or an fx rate instead. """
+        original.remove_observer(self)
+        copy.add_observer(self)
+        if original is self._asset:
+            self._asset = copy
+        else:
+            self._fx_instances = tuple(
+                copy if fx_instance is original else fx_instance
+                for fx_instance in self._fx_instances
+            )
 
     def observable_update(self, observable):
-        self._revalue()
+        self._changed()
+
+    def observable_batch_update(self, observables):
+        # the asset and fx rate may both have changed, revalue once
+        self._changed()
+
+    def _changed(self):
+        if not self._lazy:
+            self._revalue()
+        elif not self._dirty:
+            self._dirty = True
+            self.notify_observers()
 
     def _revalue(self):
+        self._update_values()
+        self.notify_observers()
+
+    def _update_values(self):
         self._local_currency_value = self._asset.local_value * self.units
-        fx_rate = FxRate.get(self._currency_pair)
+        fx_rate = self._fx_row[self._fx_col]
+        if fx_rate != fx_rate:
+            # a cross rate that needs resolving
+            fx_rate = self._context.get_rate(self._currency_pair)
         self._base_currency_value = self._local_currency_value * fx_rate
-        self.notify_observers()
 
     @property
     def asset_code(self):
@@ -65,12 +201,22 @@ class Holding(Observable):
     def base_currency_code(self):
         return self._base_currency_code
 
+    @property
+    def lazy(self):
+        return self._lazy
+
     @property
     def local_currency_value(self):
+        if self._dirty:
+            self._dirty = False
+            self._update_values()
         return self._local_currency_value
 
     @property
     def base_currency_value(self):
+        if self._dirty:
+            self._dirty = False
+            self._update_values()
         return self._base_currency_value
 
     def __str__(self):
@@ -82,29 +228,85 @@ class Holding(Observable):
             + ", "
             + self._base_currency_code
             + ", "
-            + str(self._base_currency_value)
+            + str(self.base_currency_value)
         )
 
 
 class Portfolio(Asset):
+    """ A collection of holdings valued in some base currency.
+        A lazy portfolio defers revaluation until its value is read and
+        a portfolio given a code can be held by other portfolios. See
+        also values_in and what_if_trade.
+    """
+
     _base_currency_code = StringOfFixedSize("_base_currency_code", size=3)
 
-    def __init__(self, base_currency_code="USD"):
+    def __init__(
+        self, base_currency_code="USD", lazy=False, code=None, context=None
+    ):
+        Observable.__init__(self)
+        self._context = MarketContext.resolve(context)
+        if code is None:
+            # not registered, so cannot be held by another portfolio
+            self._code_value = None
+        else:
+            self._validate_code(code)
+        self._currency_code = base_currency_code
+        self._lazy = lazy
+        # lazy holdings that changed since the value was last read
+        self._dirty_holdings = set()
         self._holdings = dict()
         self._base_currency_code = base_currency_code
-        self._value = 0
+        # the base currency value of each holding included in the total
+        self._holding_values = dict()
+        self._total = RunningSum()
+        # the local currency value of each holding included in the
+        # running sum for its currency
+        self._holding_local_values = dict()
+        self._currency_totals = dict()
+        # holdings that changed since the currency sums were updated
+        self._changed_holdings = set()
+        self._cash_holdings = dict()
 
     @property
     def base_currency_code(self):
         return self._base_currency_code
 
     @property
+    def lazy(self):
+        return self._lazy
+
+    @property
+    @synchronized
     def value(self):
-        return self._value
+        """ A running sum adjusted by the change in each holding as it
+            is revalued (revalue re-sums every holding).
+        """
+        if self._dirty_holdings:
+            self._apply_dirty_holdings()
+        return self._total.value
+
+    @property
+    def price(self):
+        """ The value of one unit, which is the whole portfolio. """
+        return self.value
+
+    @price.setter
+    def price(self, price):
+        raise ValueError("a portfolio is priced from its holdings")
 
+    def _fork(self, context):
+        raise ValueError("a portfolio is priced from its holdings")
+
+    @property
+    def local_value(self):
+        return self.value
+
+    @synchronized
     def transfer(self, asset, units):
         self._change_holdings(asset, units)
 
+    @synchronized
     def trade(self, asset, units, consideration=None):
         if consideration is None:
             consideration = asset.local_value * -units
@@ -113,39 +315,300 @@ class Portfolio(Asset):
                 raise TypeError("expecting numeric consideration")
 
         currency_code = asset.currency_code
-        if Asset.asset_code_exists(currency_code):
-            cash = Asset.get_asset_by_code(currency_code)
+        context = self._context
+        if context.asset_code_exists(currency_code):
+            cash = context.get_asset(currency_code)
         else:
-            cash = Cash(currency_code)
+            cash = Cash(currency_code, context)
         self._change_holdings(cash, consideration)
         self._change_holdings(asset, units)
 
+    def what_if_trade(self, asset, units, consideration=None):
+        """ Return the TradeLegs (cash then asset) that trade would
+            apply, without trading.
+        """
+        if consideration is None:
+            consideration = asset.local_value * -units
+        elif not isinstance(consideration, Real):
+            raise TypeError("expecting numeric consideration")
+
+        currency_code = asset.currency_code
+        currency_pair = currency_code + self._base_currency_code
+        fx_rate = self._context.get_rate(currency_pair)
+        return (
+            TradeLeg(
+                currency_code,
+                currency_code,
+                consideration,
+                consideration * fx_rate,
+                True,
+            ),
+            TradeLeg(
+                asset.code,
+                currency_code,
+                units,
+                asset.local_value * units * fx_rate,
+                isinstance(asset, Cash),
+            ),
+        )
+
     def _change_holdings(self, asset, units):
         asset_code = asset.code
+        if isinstance(asset, Portfolio):
+            self._validate_portfolio_holding(asset)
+        self._validate_market(asset)
         if asset_code in self._holdings:
-            holding = self._holdings[asset_code]
-            holding.units += units
+            # the holding notifies us of its new value
+            self._holdings[asset_code].units += units
         else:
-            holding = Holding(asset, units, self._base_currency_code)
+            holding = Holding(
+                asset,
+                units,
+                self._base_currency_code,
+                self._lazy,
+                self._context,
+            )
             holding.add_observer(self)
             self._holdings[asset_code] = holding
-        self._revalue()
+            value = holding.base_currency_value
+            self._holding_values[asset_code] = value
+            self._total.add(value)
+            self._add_holding_currency(holding)
+            self.notify_observers()
+
+    def _add_holding_currency(self, holding):
+        """ Include a new holding in the sum for its currency. """
+        currency_code = holding.asset_currency_code
+        local_value = holding.local_currency_value
+        self._holding_local_values[holding.asset_code] = local_value
+        total = self._currency_totals.get(currency_code)
+        if total is None:
+            self._currency_totals[currency_code] = RunningSum((local_value,))
+        else:
+            total.add(local_value)
+        if isinstance(holding._asset, Cash):
+            self._cash_holdings[currency_code] = holding
+
+    def _reset_currency_totals(self):
+        """ Re-sum every holding by currency. """
+        self._holding_local_values = dict()
+        self._currency_totals = dict()
+        self._changed_holdings = set()
+        self._cash_holdings = dict()
+        for holding in self._holdings.values():
+            self._add_holding_currency(holding)
+
+    def _snapshot_holdings(self):
+        """ Generate (code, units, local value, base value) for every
+            holding.
+        """
+        for code, holding in self._holdings.items():
+            yield (
+                code,
+                holding.units,
+                holding.local_currency_value,
+                holding.base_currency_value,
+            )
+
+    def _restore_holdings(self, holdings):
+        """ Add holdings from a snapshot as (asset, units, local value,
+            base value) without revaluing or notifying.
+        """
+        currencies = dict()
+        for asset, units, local_value, base_value in holdings:
+            currency_code = asset.currency_code
+            fx = currencies.get(currency_code)
+            if fx is None:
+                currency_pair = currency_code + self._base_currency_code
+                fx = currencies[currency_code] = (
+                    currency_pair,
+                    self._context.get_rate_cell(currency_pair),
+                    self._context.get_observable_instances(currency_pair),
+                )
+            holding = Holding._restore(
+                asset, units, self, fx, local_value, base_value
+            )
+            self._holdings[holding.asset_code] = holding
+            self._holding_values[holding.asset_code] = base_value
+        self._total.reset(self._holding_values.values())
+        self._reset_currency_totals()
+
+    def _validate_market(self, asset):
+        """ Only hold assets found in our market context. """
+        context = self._context
+        if asset._context is context:
+            # every asset is registered in its own context
+            return
+        if context._find_asset(asset.code) is not asset:
+            raise ValueError(
+                "%s is not in the portfolio's market" % asset.code
+            )
+
+    def _validate_portfolio_holding(self, portfolio):
+        """ Hold registered portfolios that do not hold us, where one
+            unit is worth the whole portfolio.
+        """
+        if portfolio.code is None:
+            raise ValueError("only portfolios with a code can be held")
+        if portfolio is self or depends_on(portfolio, self):
+            raise ValueError(
+                "holding %s would create a cycle" % portfolio.code
+            )
 
     def observable_update(self, observable):
-        self._revalue()
+        if self._lazy:
+            self._mark_dirty((observable,))
+            return
+        self._apply_holding_change(observable)
+        self.notify_observers()
+
+    def observable_batch_update(self, observables):
+        if self._lazy:
+            self._mark_dirty(observables)
+            return
+        for holding in observables:
+            self._apply_holding_change(holding)
+        self.notify_observers()
+
+    def _mark_dirty(self, holdings):
+        """ Note lazy holdings that changed, notifying observers only
+            when a clean portfolio first changes.
+        """
+        was_clean = not self._dirty_holdings
+        self._dirty_holdings.update(holdings)
+        if was_clean:
+            self.notify_observers()
+
+    def _apply_dirty_holdings(self):
+        dirty_holdings = self._dirty_holdings
+        self._dirty_holdings = set()
+        for holding in dirty_holdings:
+            self._apply_holding_change(holding)
+
+    def _apply_holding_change(self, holding):
+        """ Adjust the total by the change in one holding's value. """
+        asset_code = holding.asset_code
+        value = holding.base_currency_value
+        self._total.replace(self._holding_values[asset_code], value)
+        self._holding_values[asset_code] = value
+        # fx rate ticks leave local values, and so the currency sums, as
+        # they were
+        local_value = holding._local_currency_value
+        if local_value != self._holding_local_values[asset_code]:
+            self._changed_holdings.add(holding)
+
+    def _update_currency_totals(self):
+        """ Adjust the sum for each currency by the change in the
+            local value of each holding that changed.
+        """
+        changed_holdings = self._changed_holdings
+        self._changed_holdings = set()
+        for holding in changed_holdings:
+            asset_code = holding.asset_code
+            local_value = holding.local_currency_value
+            old_local_value = self._holding_local_values[asset_code]
+            if local_value != old_local_value:
+                self._currency_totals[holding.asset_currency_code].replace(
+                    old_local_value, local_value
+                )
+                self._holding_local_values[asset_code] = local_value
 
     def _revalue(self):
-        value = 0
-        for _, holding in self._holdings.items():
-            value += holding.base_currency_value
-        self._value = value
+        """ Re-sum every holding to rebuild the running total. """
+        self._dirty_holdings.clear()
+        self._holding_values = {
+            code: holding.base_currency_value
+            for code, holding in self._holdings.items()
+        }
+        self._total.reset(self._holding_values.values())
+        self._reset_currency_totals()
+
+    @synchronized
+    def local_exposures(self):
+        """ Map each currency held to the local currency value of the
+            holdings (including cash) in that currency. These are kept
+            as running sums, adjusted when read for the holdings whose
+            local value changed (fx rate ticks leave them alone).
+        """
+        if self._dirty_holdings:
+            self._apply_dirty_holdings()
+        if self._changed_holdings:
+            self._update_currency_totals()
+        return {
+            currency_code: total.value
+            for currency_code, total in self._currency_totals.items()
+        }
+
+    def currency_exposures(self):
+        """ Map each currency held to the base currency value of the
+            holdings (including cash) in that currency.
+        """
+        base_currency_code = self.base_currency_code
+        get_rate = self._context.get_rate
+        return {
+            currency_code: local_value
+            * get_rate(currency_code + base_currency_code)
+            for currency_code, local_value in self.local_exposures().items()
+        }
+
+    def get_currency_exposure(self, currency_code):
+        """ Return the base currency value of the holdings in a
+            currency.
+        """
+        currency_code = str(currency_code).strip().upper()
+        local_value = self.local_exposures().get(currency_code)
+        if local_value is None:
+            return 0
+        currency_pair = currency_code + self.base_currency_code
+        return local_value * self._context.get_rate(currency_pair)
+
+    def values_in(self, currency_codes):
+        """ Map each of some currencies to the portfolio's value in
+            that currency, e.g. values_in(["USD", "EUR", "AUD"]), from
+            the local currency sums rather than every holding.
+        """
+        local_exposures = self.local_exposures()
+        held_currency_codes = list(local_exposures)
+        local_values = [local_exposures[code] for code in held_currency_codes]
+        values = OrderedDict()
+        for currency_code in currency_codes:
+            currency_code = str(currency_code).strip().upper()
+            fx_rates = [
+                self._context.get_rate(held_currency_code + currency_code)
+                for held_currency_code in held_currency_codes
+            ]
+            values[currency_code] = fsum(map(mul, local_values, fx_rates))
+        return values
+
+    def value_in(self, currency_code):
+        """ Return the portfolio's value in some currency. """
+        return self.values_in((currency_code,)).popitem()[1]
+
+    @synchronized
+    def cash_by_currency(self):
+        """ Map each currency held as cash to the units held. """
+        return {
+            currency_code: holding.units
+            for currency_code, holding in self._cash_holdings.items()
+        }
+
+    def holding_codes(self):
+        return tuple(self._holdings)
+
+    def get_holding_value(self, asset_code):
+        """ Return the base currency value of a holding. """
+        asset_code = str(asset_code).strip().upper()
+        holding = self._holdings.get(asset_code)
+        if holding is None:
+            return 0
+        return holding.base_currency_value
 
     def get_holding_units(self, asset_code):
         asset_code = str(asset_code).strip().upper()
-        for code, holding in self._holdings.items():
-            if code == asset_code:
-                return holding.units
-        return 0
+        holding = self._holdings.get(asset_code)
+        if holding is None:
+            return 0
+        return holding.units
 
     def __str__(self):
         return "Portfolio -> " + "\n".join(
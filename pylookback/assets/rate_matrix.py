@@ -0,0 +1,84 @@
+"""
+A dense table of fx rates between interned currencies.
+Each currency is given an integer index and row i holds the rates
+that convert currency i into every other currency, so a conversion
+is a single indexed read. Rates that are not known are nan.
+"""
+from array import array
+
+
+NAN = float("nan")
+
+
+class RateMatrix:
+    """ Rates between currencies, stored as one array per row.
+        Rows grow in place as currencies are added so references to
+        a row remain valid.
+    >>> matrix = RateMatrix()
+    >>> matrix.set_rate("AUD", "USD", 0.5)
+    >>> matrix.get("USD", "AUD")
+    2.0
+    >>> row, col = matrix.get_cell("AUD", "USD")
+    >>> row[col]
+    0.5
+    """
+
+    def __init__(self):
+        self._indices = dict()
+        self._currencies = list()
+        self._rows = list()
+
+    @property
+    def currencies(self):
+        return tuple(self._currencies)
+
+    def intern(self, currency_code):
+        """ Return the index of a currency, adding it if required. """
+        index = self._indices.get(currency_code)
+        if index is not None:
+            return index
+
+        index = len(self._currencies)
+        for row in self._rows:
+            row.append(NAN)
+        row = array("d", [NAN]) * (index + 1)
+        row[index] = 1.0
+        self._rows.append(row)
+        self._currencies.append(currency_code)
+        self._indices[currency_code] = index
+        return index
+
+    def index(self, currency_code):
+        """ Return the index of a currency or None if unknown. """
+        return self._indices.get(currency_code)
+
+    def get_cell(self, ccy1, ccy2):
+        """ Return the (row, column) holding the rate from ccy1 to ccy2.
+            Reading row[column] always returns the current rate.
+        """
+        i = self.intern(ccy1)
+        j = self.intern(ccy2)
+        return self._rows[i], j
+
+    def get(self, ccy1, ccy2):
+        i = self._indices.get(ccy1)
+        j = self._indices.get(ccy2)
+        if i is None or j is None:
+            return NAN
+        return self._rows[i][j]
+
+    def set_rate(self, ccy1, ccy2, rate):
+        """ Set the rate from ccy1 to ccy2 and its inverse. """
+        i = self.intern(ccy1)
+        j = self.intern(ccy2)
+        self._rows[i][j] = rate
+        self._rows[j][i] = 1 / rate if rate else float("inf")
+
+    def clear_rate(self, ccy1, ccy2):
+        """ Forget the rate between two currencies. """
+        i = self._indices.get(ccy1)
+        j = self._indices.get(ccy2)
+        if i is None or j is None or i == j:
+            return
+        self._rows[i][j] = NAN
+        self._rows[j][i] = NAN
@@ -2,5 +2,7 @@ from .asset import Asset
 
 
 class Stock(Asset):
+    __slots__ = ()
+
     def _revalue(self):
         self._local_value = self._price
@@ -0,0 +1,126 @@
+"""
+Replay historical prices and fx rates through our assets.
+Ticks are consumed lazily from any iterable, applied one timestamp at
+a time in a single batch, and portfolio values are recorded into
+preallocated arrays.
+"""
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+from .assets import Asset, FxRate, Portfolio
+from .buffers import GrowableArray
+from .observable import Observable
+
+
+# code is either an asset code or a currency pair
+Tick = namedtuple("Tick", ["timestamp", "code", "value"])
+
+
+def iter_steps(ticks):
+    """ Group time ordered ticks into (timestamp, prices, rates) steps.
+        Ticks for asset codes become prices and all other codes
+        are treated as currency pairs.
+    """
+    last_timestamp = None
+    for timestamp, group in groupby(ticks, key=itemgetter(0)):
+        if last_timestamp is not None and timestamp < last_timestamp:
+            raise ValueError("ticks must be in timestamp order")
+        last_timestamp = timestamp
+
+        prices = dict()
+        rates = dict()
+        for _, code, value in group:
+            if Asset.asset_code_exists(code):
+                prices[code] = value
+            else:
+                rates[code] = value
+        yield timestamp, prices, rates
+
+
+def apply_step(prices, rates):
+    """ Apply prices and rates for one timestamp as a single batch. """
+    with Observable.batch_updates():
+        FxRate.update_rates(rates)
+        Asset.update_prices(prices)
+
+
+def replay(ticks):
+    """ Apply time ordered ticks one timestamp at a time,
+        generating each timestamp once it has been applied.
+    """
+    for timestamp, prices, rates in iter_steps(ticks):
+        apply_step(prices, rates)
+        yield timestamp
+
+
+class Backtest:
+    """ Step through ticks, letting each actor perform after prices
+        for a timestamp have been applied and then recording the value
+        of every portfolio. Timestamps must be numeric (e.g. seconds
+        since the epoch).
+    """
+
+    def __init__(self, ticks, capacity=1024):
+        self._ticks = ticks
+        self._capacity = capacity
+        self._actors = list()
+        self._portfolios = list()
+        self._timestamps = GrowableArray("d", capacity)
+        self._values = list()
+        self._timestamp = None
+
+    @property
+    def timestamp(self):
+        """ The timestamp of the step being processed. """
+        return self._timestamp
+
+    def add_actor(self, actor):
+        self._actors.append(actor)
+        self.add_portfolio(actor.portfolio)
+
+    def add_portfolio(self, portfolio):
+        """ Record the value of this portfolio at every step. """
+        if not isinstance(portfolio, Portfolio):
+            raise TypeError("expected portfolio instance")
+        if self._get_portfolio_index(portfolio) is not None:
+            return
+        if len(self._timestamps):
+            raise ValueError("backtest has already started")
+        self._portfolios.append(portfolio)
+        self._values.append(GrowableArray("d", self._capacity))
+
+    def _get_portfolio_index(self, portfolio):
+        for index, recorded in enumerate(self._portfolios):
+            if recorded is portfolio:
+                return index
+        return None
+
+    def steps(self):
+        """ Generate each timestamp once its step is complete. """
+        for timestamp in replay(self._ticks):
+            self._timestamp = timestamp
+            for actor in self._actors:
+                actor.perform()
+            self._record(timestamp)
+            yield timestamp
+
+    def run(self):
+        for _ in self.steps():
+            pass
+        return self
+
+    def _record(self, timestamp):
+        self._timestamps.append(timestamp)
+        for portfolio, values in zip(self._portfolios, self._values):
+            values.append(portfolio.value)
+
+    @property
+    def timestamps(self):
+        return self._timestamps.to_array()
+
+    def get_values(self, portfolio):
+        """ Return the recorded values of a portfolio as an array. """
+        index = self._get_portfolio_index(portfolio)
+        if index is None:
+            raise ValueError("portfolio is not recorded")
+        return self._values[index].to_array()
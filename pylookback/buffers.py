@@ -0,0 +1,92 @@
+"""
+Preallocated numeric buffers for recording results without building
+lists of Python objects.
+"""
+from array import array
+
+
+class GrowableArray:
+    """ An array.array that is allocated up front and written by index.
+        When full the capacity is doubled.
+    >>> values = GrowableArray("d", capacity=2)
+    >>> for value in (1.0, 2.0, 3.0):
+    ...     values.append(value)
+    >>> len(values), values.capacity
+    (3, 4)
+    >>> values.to_array()
+    array('d', [1.0, 2.0, 3.0])
+    """
+
+    def __init__(self, typecode, capacity=1024):
+        if not isinstance(capacity, int):
+            raise TypeError("capacity must be int")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        itemsize = array(typecode).itemsize
+        self._data = array(typecode, bytes(itemsize * capacity))
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def append(self, value):
+        if self._size == len(self._data):
+            self._grow()
+        self._data[self._size] = value
+        self._size += 1
+
+    def _grow(self):
+        data = self._data
+        data.frombytes(bytes(data.itemsize * len(data)))
+
+    def to_array(self):
+        """ Return a copy of the values written so far. """
+        return self._data[: self._size]
+
+    def __len__(self):
+        return self._size
+
+
+class RingArray:
+    """ A fixed size array.array that overwrites its oldest values.
+    >>> values = RingArray("d", capacity=2)
+    >>> for value in (1.0, 2.0, 3.0):
+    ...     values.append(value)
+    >>> values.to_array()
+    array('d', [2.0, 3.0])
+    """
+
+    def __init__(self, typecode, capacity=1024):
+        if not isinstance(capacity, int):
+            raise TypeError("capacity must be int")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        itemsize = array(typecode).itemsize
+        self._data = array(typecode, bytes(itemsize * capacity))
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def append(self, value):
+        capacity = len(self._data)
+        if self._size < capacity:
+            self._data[self._size] = value
+            self._size += 1
+        else:
+            self._data[self._start] = value
+            self._start = (self._start + 1) % capacity
+
+    def to_array(self):
+        """ Return a copy of the values held, oldest first. """
+        data = self._data
+        if self._size < len(data):
+            return data[: self._size]
+        start = self._start
+        return data[start:] + data[:start]
+
+    def __len__(self):
+        return self._size
@@ -2,22 +2,36 @@ from numbers import Real
 
 
 class Descriptor:
+    """ Values are stored under name + '_value' rather than in the
+        instance __dict__ so that classes using descriptors can
+        declare that attribute in __slots__.
+    """
+
     def __init__(self, name):
         self.name = name
+        self.storage_name = name + "_value"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance, self.storage_name)
 
     def __set__(self, instance, value):
         if isinstance(value, str):
             # make all of our descriptor strings uppercase
-            instance.__dict__[self.name] = value.upper()
-        else:
-            instance.__dict__[self.name] = value
+            value = value.upper()
+        setattr(instance, self.storage_name, value)
 
 
 class Typed(Descriptor):
     expected_type = type(None)
+    # common types accepted without the (slower) isinstance check
+    exact_types = ()
 
     def __set__(self, instance, value):
-        if not isinstance(value, self.expected_type):
+        if type(value) not in self.exact_types and not isinstance(
+            value, self.expected_type
+        ):
             raise TypeError("expected " + str(self.expected_type))
         super().__set__(instance, value)
 
@@ -44,18 +58,22 @@ class FixedSized(Descriptor):
 
 class String(Typed):
     expected_type = str
+    exact_types = (str,)
 
 
 class Integer(Typed):
     expected_type = int
+    exact_types = (int,)
 
 
 class SignedReal(Typed):
     expected_type = Real
+    exact_types = (float, int)
 
 
 class UnsignedReal(Typed, Unsigned):
     expected_type = Real
+    exact_types = (float, int)
 
 
 class StringOfFixedSize(String, FixedSized):
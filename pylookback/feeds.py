@@ -0,0 +1,118 @@
+"""
+Apply live market data from asyncio feeds.
+
+A feed is any async iterable of Tick tuples (see backtest.py). Updates
+that arrive during one iteration of the event loop are coalesced, the
+latest value for each code wins, and are applied as a single batch on
+the next iteration, so many feeds can share one loop without each tick
+triggering its own revaluation cascade.
+"""
+import asyncio
+from .assets import Asset, FxRate
+from .backtest import Tick, apply_step
+
+
+class FeedHandler:
+    """ Consume feeds and apply their prices and rates, e.g.
+
+        handler = FeedHandler()
+        await handler.run(prices_feed, rates_feed)
+
+        Codes must already be registered as assets or currency pairs.
+    """
+
+    def __init__(self):
+        self._prices = dict()
+        self._rates = dict()
+        self._flush_handle = None
+
+    def submit(self, code, value):
+        """ Queue a price or rate to be applied on the next iteration
+            of the event loop.
+        """
+        if Asset.asset_code_exists(code):
+            self._prices[code] = value
+        elif FxRate.currency_pair_exists(code):
+            self._rates[code] = value
+        else:
+            raise ValueError("%s is not a registered code" % code)
+
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """ Apply every queued update as a single batch. """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        prices, rates = self._prices, self._rates
+        self._prices = dict()
+        self._rates = dict()
+        if prices or rates:
+            apply_step(prices, rates)
+
+    async def consume(self, feed):
+        """ Submit every tick from an async iterable. """
+        async for _, code, value in feed:
+            self.submit(code, value)
+
+    async def run(self, *feeds):
+        """ Consume feeds concurrently until they are all exhausted. """
+        try:
+            await asyncio.gather(*[self.consume(feed) for feed in feeds])
+        finally:
+            self.flush()
+
+
+class FakeFeed:
+    """ An in process feed that replays ticks, optionally sleeping
+        between them to simulate a live source.
+    """
+
+    def __init__(self, ticks, interval=0):
+        self._ticks = iter(ticks)
+        self._interval = interval
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self._interval)
+        try:
+            return Tick(*next(self._ticks))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class AsyncObserver:
+    """ Adapt a coroutine function to the observer interface.
+        Each notification schedules callback(observable) as a task on
+        the event loop current when the observer was created (or the
+        loop given), so that a slow observer never blocks the update
+        that notified it. Notifications may come from outside the loop,
+        e.g. another thread, and are handed to it thread safely.
+        As with all observers, keep a reference to this object for as
+        long as it should observe.
+    """
+
+    def __init__(self, callback, loop=None):
+        self._callback = callback
+        self._loop = asyncio.get_event_loop() if loop is None else loop
+        self._tasks = set()
+
+    def observable_update(self, observable):
+        self._loop.call_soon_threadsafe(self._start, observable)
+
+    def _start(self, observable):
+        task = self._loop.create_task(self._callback(observable))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """ Wait for every scheduled callback to finish. """
+        # let the loop start callbacks that are scheduled but not begun
+        await asyncio.sleep(0)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+            await asyncio.sleep(0)
@@ -0,0 +1,111 @@
+"""
+The dependency graph formed by observables and their observers.
+
+Edges run from an observable to each of its observers, e.g. from an
+asset or fx rate to the holdings that value it and from those holdings
+to their portfolio. Notifications are propagated through this graph in
+topological order (see Observable.batch_updates) so that every observer
+is updated once per change, after everything it observes.
+"""
+from collections import OrderedDict
+
+
+def get_observers(node):
+    """ Return the direct observers of node (none if it is not an
+        observable, e.g. a recorder at the edge of the graph).
+    """
+    observers = getattr(node, "_observers", None)
+    return () if observers is None else tuple(observers)
+
+
+def topological_order(nodes):
+    """ Return nodes and every observer reachable from them,
+        each placed after every node it observes. An edge that would
+        close a cycle is ignored.
+    """
+    order = []
+    visited = set()
+    for root in nodes:
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(get_observers(root)))]
+        while stack:
+            node, observers = stack[-1]
+            for observer in observers:
+                if observer not in visited:
+                    visited.add(observer)
+                    stack.append((observer, iter(get_observers(observer))))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+    order.reverse()
+    return order
+
+
+def depends_on(node, other):
+    """ Return True if node observes other, directly or indirectly. """
+    return node is not other and node in topological_order([other])
+
+
+class DependencyGraph:
+    """ A snapshot of the graph reachable from some observables, e.g.
+
+        graph = DependencyGraph([FxRate.get_instance("AUDUSD")])
+        graph.total_fan_out(audusd)  # everything a rate tick revalues
+
+        The snapshot holds strong references to every node, so discard
+        it once inspected.
+    """
+
+    def __init__(self, roots):
+        self._order = topological_order(roots)
+        self._observers = OrderedDict(
+            (node, get_observers(node)) for node in self._order
+        )
+
+    @property
+    def nodes(self):
+        """ Every node in topological order. """
+        return tuple(self._order)
+
+    @property
+    def edges(self):
+        """ (observable, observer) pairs. """
+        return tuple(
+            (node, observer)
+            for node, observers in self._observers.items()
+            for observer in observers
+        )
+
+    def observers_of(self, node):
+        observers = self._observers.get(node)
+        if observers is None:
+            raise ValueError("%s is not in the graph" % node)
+        return observers
+
+    def fan_out(self, node):
+        """ The number of direct observers of node. """
+        return len(self.observers_of(node))
+
+    def total_fan_out(self, node):
+        """ The number of nodes updated when node changes. """
+        self.observers_of(node)
+        return len(topological_order([node])) - 1
+
+    def fan_out_sizes(self):
+        """ Map each node to its number of direct observers. """
+        return OrderedDict(
+            (node, len(observers))
+            for node, observers in self._observers.items()
+        )
+
+    def __contains__(self, node):
+        return node in self._observers
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
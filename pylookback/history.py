@@ -0,0 +1,230 @@
+"""
+A price history store for point in time lookups.
+
+Each asset price series (keyed by Asset.code) and fx rate series
+(keyed by FxRate.currency_pair) is saved as its own file of sorted
+timestamps followed by values:
+
+    header:  magic (8 bytes), count (int64)
+    columns: timestamps (float64 * count), values (float64 * count)
+
+Series are read through memory maps, so "as of" lookups are a binary
+search over the mapped timestamps and slices of history are zero-copy
+memoryviews. Numbers are stored in native byte order.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from .assets import Asset, FxRate
+from .backtest import apply_step
+
+
+MAGIC = b"PLBHIST1"
+_HEADER = struct.Struct("=8sq")
+_INDEX_FILE = "index.json"
+PRICES = "prices"
+RATES = "rates"
+
+
+class HistoryWriter:
+    """ Collect prices and rates and write them to a directory.
+        Values are held in compact arrays until close is called.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._series = {PRICES: dict(), RATES: dict()}
+
+    def _append(self, kind, key, timestamp, value):
+        series = self._series[kind].get(key)
+        if series is None:
+            series = self._series[kind][key] = (array("d"), array("d"))
+        timestamps, values = series
+        timestamps.append(timestamp)
+        values.append(value)
+
+    def add_price(self, code, timestamp, price):
+        self._append(PRICES, code, timestamp, price)
+
+    def add_rate(self, currency_pair, timestamp, rate):
+        self._append(RATES, currency_pair, timestamp, rate)
+
+    def add_ticks(self, ticks):
+        """ Add ticks, treating registered asset codes as prices
+            and all other codes as currency pairs.
+        """
+        for timestamp, code, value in ticks:
+            if Asset.asset_code_exists(code):
+                self.add_price(code, timestamp, value)
+            else:
+                self.add_rate(code, timestamp, value)
+
+    def close(self):
+        if self._series is None:
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        index = dict()
+        for kind, prefix in ((PRICES, "p"), (RATES, "r")):
+            index[kind] = dict()
+            for number, key in enumerate(sorted(self._series[kind])):
+                file_name = "%s%d.series" % (prefix, number)
+                timestamps, values = self._series[kind][key]
+                _write_series(
+                    os.path.join(self._directory, file_name),
+                    timestamps,
+                    values,
+                )
+                index[kind][key] = file_name
+        with open(os.path.join(self._directory, _INDEX_FILE), "w") as file:
+            json.dump(index, file, indent=2, sort_keys=True)
+        self._series = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _write_series(path, timestamps, values):
+    # a stable sort keeps the last value written for equal timestamps
+    if any(map(float.__gt__, timestamps, timestamps[1:])):
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        timestamps = array("d", map(timestamps.__getitem__, order))
+        values = array("d", map(values.__getitem__, order))
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, len(timestamps)))
+        timestamps.tofile(file)
+        values.tofile(file)
+
+
+class _Series:
+    """ A memory mapped series of sorted timestamps and values. """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        magic, count = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            buffer.release()
+            self._mmap.close()
+            raise ValueError("%s is not a price history series" % path)
+        start = _HEADER.size
+        middle = start + 8 * count
+        end = middle + 8 * count
+        self.timestamps = buffer[start:middle].cast("d")
+        self.values = buffer[middle:end].cast("d")
+        buffer.release()
+
+    def as_of(self, timestamp):
+        index = bisect_right(self.timestamps, timestamp)
+        if index == 0:
+            return None
+        return self.values[index - 1]
+
+    def between(self, start, end):
+        timestamps = self.timestamps
+        lo = 0 if start is None else bisect_left(timestamps, start)
+        hi = len(timestamps) if end is None else bisect_right(timestamps, end)
+        return timestamps[lo:hi], self.values[lo:hi]
+
+    def close(self):
+        self.timestamps.release()
+        self.values.release()
+        self._mmap.close()
+
+
+class PriceHistory:
+    """ Read prices and rates as of any point in time.
+        Series are mapped into memory the first time they are used.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        with open(os.path.join(directory, _INDEX_FILE)) as file:
+            self._index = json.load(file)
+        self._open = {PRICES: dict(), RATES: dict()}
+
+    @property
+    def codes(self):
+        return tuple(sorted(self._index[PRICES]))
+
+    @property
+    def currency_pairs(self):
+        return tuple(sorted(self._index[RATES]))
+
+    def _get_series(self, kind, key):
+        series = self._open[kind].get(key)
+        if series is None:
+            file_name = self._index[kind].get(key)
+            if file_name is None:
+                raise ValueError("no history for %s" % key)
+            path = os.path.join(self._directory, file_name)
+            series = self._open[kind][key] = _Series(path)
+        return series
+
+    def get_price(self, code, timestamp):
+        """ Return the last price at or before timestamp (or None). """
+        return self._get_series(PRICES, code).as_of(timestamp)
+
+    def get_rate(self, currency_pair, timestamp):
+        """ Return the last rate at or before timestamp (or None). """
+        return self._get_series(RATES, currency_pair).as_of(timestamp)
+
+    def get_prices(self, code, start=None, end=None):
+        """ Return (timestamps, prices) memoryviews between start and
+            end inclusive. These are views of the mapped file and must
+            be released before the history is closed.
+        """
+        return self._get_series(PRICES, code).between(start, end)
+
+    def get_rates(self, currency_pair, start=None, end=None):
+        return self._get_series(RATES, currency_pair).between(start, end)
+
+    def prices_at(self, timestamp):
+        """ Return the price of every asset as of timestamp. """
+        return self._values_at(PRICES, timestamp)
+
+    def rates_at(self, timestamp):
+        """ Return every fx rate as of timestamp. """
+        return self._values_at(RATES, timestamp)
+
+    def _values_at(self, kind, timestamp):
+        values = dict()
+        for key in self._index[kind]:
+            value = self._get_series(kind, key).as_of(timestamp)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def rewind(self, timestamp):
+        """ Set every registered asset's price and fx rate to its value
+            as of timestamp, notifying observers once.
+        """
+        prices = {
+            code: price
+            for code, price in self.prices_at(timestamp).items()
+            if Asset.asset_code_exists(code)
+        }
+        rates = {
+            currency_pair: rate
+            for currency_pair, rate in self.rates_at(timestamp).items()
+            if FxRate.currency_pair_exists(currency_pair)
+        }
+        apply_step(prices, rates)
+
+    def close(self):
+        for kind in (PRICES, RATES):
+            for series in self._open[kind].values():
+                series.close()
+            self._open[kind].clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,212 @@
+"""
+Opt in counters and timings for revaluation and notification.
+
+Enabling instrumentation wraps the methods being measured and disabling
+it puts the originals back, so there is no cost at all when it is off:
+
+    with Instrumentation(by_code=True) as instrumentation:
+        Asset.update_prices(prices)
+    print(instrumentation.to_json(indent=2))
+
+Each method records a call count, the total and maximum time spent in
+it and a histogram of call times in power of two nanosecond buckets.
+Times are inclusive, e.g. notify_observers includes the time spent
+revaluing every observer it reaches.
+"""
+import json
+from functools import wraps
+from time import perf_counter
+from .assets import (
+    ArrayPortfolio,
+    Asset,
+    Cash,
+    FxRate,
+    Holding,
+    MarketContext,
+    Portfolio,
+    Stock,
+)
+from .observable import Observable
+
+
+def default_targets():
+    """ The (class, method name) pairs measured by default. """
+    return (
+        (Observable, "notify_observers"),
+        (Observable, "_flush"),
+        (Asset, "revalue"),
+        (Stock, "_revalue"),
+        (Cash, "_revalue"),
+        (Holding, "_revalue"),
+        (Holding, "_update_values"),
+        (Portfolio, "_revalue"),
+        (Portfolio, "observable_update"),
+        (Portfolio, "observable_batch_update"),
+        (ArrayPortfolio, "_revalue"),
+        (ArrayPortfolio, "observable_update"),
+        (ArrayPortfolio, "observable_batch_update"),
+        (FxRate, "get"),
+        (MarketContext, "get_rate"),
+    )
+
+
+def _get_code(args):
+    """ Return the asset code or currency pair a call relates to. """
+    for arg in args[:2]:
+        if isinstance(arg, str):
+            return arg
+        for attribute in ("code", "asset_code", "currency_pair"):
+            code = getattr(arg, attribute, None)
+            if isinstance(code, str):
+                return code
+    return None
+
+
+class _Stats:
+    __slots__ = ("count", "seconds", "max_seconds", "histogram", "codes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # bucket n counts calls taking less than 2 ** n nanoseconds
+        self.histogram = dict()
+        self.codes = dict()
+
+    def add(self, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        bucket = int(seconds * 1e9).bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def get_code_stats(self, code):
+        stats = self.codes.get(code)
+        if stats is None:
+            stats = self.codes[code] = _Stats()
+        return stats
+
+    def to_dict(self):
+        stats = {
+            "count": self.count,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            "histogram_ns": {
+                2 ** bucket: self.histogram[bucket]
+                for bucket in sorted(self.histogram)
+            },
+        }
+        if self.codes:
+            stats["codes"] = {
+                code: self.codes[code].to_dict() for code in sorted(self.codes)
+            }
+        return stats
+
+
+class Instrumentation:
+    """ Count and time calls to methods of our classes.
+
+        targets:    (class, method name) pairs to measure, by default
+                    see default_targets
+        by_code:    also break down each method by the asset code or
+                    currency pair it was called for
+        clock:      returns the time in seconds
+    """
+
+    def __init__(self, targets=None, by_code=False, clock=perf_counter):
+        self._targets = tuple(
+            default_targets() if targets is None else targets
+        )
+        self._by_code = by_code
+        self._clock = clock
+        self._stats = dict()
+        # (class, name, original attribute) for each wrapped method
+        self._originals = list()
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def enable(self):
+        if self._originals:
+            return
+        for cls, name in self._targets:
+            if name not in cls.__dict__:
+                self.disable()
+                raise ValueError(
+                    "%s does not define %s" % (cls.__name__, name)
+                )
+            if getattr(getattr(cls, name), "_instrumented", False):
+                self.disable()
+                raise ValueError(
+                    "%s.%s is already instrumented" % (cls.__name__, name)
+                )
+            original = cls.__dict__[name]
+            key = "%s.%s" % (cls.__name__, name)
+            if isinstance(original, (classmethod, staticmethod)):
+                wrapper = type(original)(self._wrap(key, original.__func__))
+            else:
+                wrapper = self._wrap(key, original)
+            setattr(cls, name, wrapper)
+            self._originals.append((cls, name, original))
+
+    def disable(self):
+        while self._originals:
+            cls, name, original = self._originals.pop()
+            setattr(cls, name, original)
+
+    def _wrap(self, key, function):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _Stats()
+        clock = self._clock
+        by_code = self._by_code
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = clock() - start
+                stats.add(seconds)
+                if by_code:
+                    code = _get_code(args)
+                    if code is not None:
+                        stats.get_code_stats(code).add(seconds)
+
+        wrapper._instrumented = True
+        return wrapper
+
+    def reset(self):
+        """ Clear everything recorded so far. """
+        for stats in self._stats.values():
+            stats.__init__()
+
+    def get_count(self, key):
+        """ Return the number of calls to a method, e.g. 'FxRate.get'. """
+        stats = self._stats.get(key)
+        return 0 if stats is None else stats.count
+
+    def snapshot(self):
+        """ Return everything recorded as a dictionary keyed by
+            'Class.method', skipping methods that were not called.
+        """
+        return {
+            key: self._stats[key].to_dict()
+            for key in sorted(self._stats)
+            if self._stats[key].count
+        }
+
+    def to_json(self, **kwargs):
+        """ Return the snapshot as JSON, kwargs are passed to json.dumps.
+        """
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
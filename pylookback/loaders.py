@@ -0,0 +1,76 @@
+"""
+Stream ticks from files without loading them into memory.
+
+CSV files are read a chunk of rows at a time and tick files (see
+tickfile.py) are read through a memory map. Both produce Tick tuples
+that can be merged in timestamp order and replayed through the asset
+and fx registries with backtest.replay or a Backtest, e.g.
+
+    prices = read_csv_ticks("prices.csv")
+    rates = read_tick_file("rates.ticks")
+    for timestamp in replay(merge_ticks(prices, rates)):
+        ...
+"""
+import csv
+import heapq
+from itertools import islice
+from operator import itemgetter
+from .backtest import Tick
+from .tickfile import TickFile, write_ticks
+
+
+def read_csv_ticks(
+    path,
+    timestamp_column="timestamp",
+    code_column="code",
+    value_column="value",
+    parse_timestamp=float,
+    chunk_size=65536,
+):
+    """ Generate ticks from a csv file with a header row.
+        For bar files pass the column to use as the value, e.g. 'close'.
+        parse_timestamp converts the timestamp text to a number.
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [timestamp_column, code_column, value_column]
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError("%s missing columns %s" % (path, missing))
+        get_fields = itemgetter(*map(header.index, columns))
+
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                break
+            for timestamp, code, value in map(get_fields, rows):
+                yield Tick(parse_timestamp(timestamp), code, float(value))
+
+
+def read_tick_file(path):
+    """ Generate ticks from a tick file, closing it when exhausted. """
+    with TickFile(path) as tick_file:
+        ticks = iter(tick_file)
+        try:
+            yield from ticks
+        finally:
+            # release the chunk views before the file is unmapped
+            ticks.close()
+
+
+def csv_to_tick_file(csv_path, tick_path, chunk_size=65536, **kwargs):
+    """ Convert a csv file into a (much faster to read) tick file.
+        kwargs are passed to read_csv_ticks.
+    """
+    ticks = read_csv_ticks(csv_path, chunk_size=chunk_size, **kwargs)
+    write_ticks(tick_path, ticks, chunk_size)
+
+
+def merge_ticks(*streams):
+    """ Merge time ordered streams of ticks into one time ordered stream.
+        Ticks with equal timestamps are taken in stream order.
+    """
+    return heapq.merge(*streams, key=itemgetter(0))
@@ -1,16 +1,246 @@
-from weakref import WeakSet
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from threading import RLock
+from weakref import WeakSet, ref
+
+
+class _NoLock:
+    """ Stands in for the lock when thread safety is disabled. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_LOCK = _NoLock()
+
+
+def synchronized(method):
+    """ Hold the observable lock while calling method,
+        if thread safety has been enabled.
+    """
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        lock = Observable._lock
+        if lock is None:
+            return method(*args, **kwargs)
+        with lock:
+            return method(*args, **kwargs)
+
+    return wrapper
 
 
 class Observable:
+    """ Notify observers of changes by calling observable_update.
+        Observers are held weakly and updated in dependency order, see
+        batch_updates and enable_thread_safety.
+    """
+
+    __slots__ = ("_observer_refs", "_rank", "__weakref__")
+
+    # batching state shared by all observables
+    _batch_depth = 0
+    _pending = None
+
+    # a reentrant lock, or None when thread safety is disabled
+    _lock = None
+
     def __init__(self):
-        self._observers = WeakSet()
+        # None, a weak reference or a WeakSet
+        self._observer_refs = None
+        # one more than the highest rank of anything we observe
+        self._rank = 0
+
+    @staticmethod
+    def enable_thread_safety():
+        """ Make every change (prices, rates, trades, observer
+            registration and whole batches) while holding one reentrant
+            lock, so readers never see a partial update. Call this
+            before feeding updates from several threads.
+        """
+        if Observable._lock is None:
+            Observable._lock = RLock()
+
+    @staticmethod
+    def disable_thread_safety():
+        Observable._lock = None
+
+    @staticmethod
+    def thread_safety_enabled():
+        return Observable._lock is not None
+
+    @staticmethod
+    def locked():
+        """ Return a context manager holding the observable lock
+            (which does nothing if thread safety is disabled).
+        """
+        lock = Observable._lock
+        return _NO_LOCK if lock is None else lock
+
+    @property
+    def _observers(self):
+        observer_refs = self._observer_refs
+        if observer_refs is None:
+            return ()
+        if type(observer_refs) is ref:
+            observer = observer_refs()
+            return () if observer is None else (observer,)
+        return observer_refs
+
+    @property
+    def rank(self):
+        """ One more than the highest rank of anything we observe. """
+        return self._rank
 
+    @synchronized
     def add_observer(self, observer):
-        self._observers.add(observer)
+        """ Hold observer weakly, a WeakSet is only allocated for a
+            second observer. An observable observer is ranked above us.
+        """
+        if isinstance(observer, Observable):
+            self._raise_rank(observer, self._rank + 1)
+        observer_refs = self._observer_refs
+        if observer_refs is None:
+            self._observer_refs = ref(observer)
+        elif type(observer_refs) is ref:
+            current = observer_refs()
+            if current is None:
+                self._observer_refs = ref(observer)
+            elif current is not observer:
+                self._observer_refs = WeakSet((current, observer))
+        else:
+            observer_refs.add(observer)
 
+    def _raise_rank(self, observer, rank):
+        """ Ensure observer, and so everything downstream of it,
+            is ranked above us.
+        """
+        # collect the new ranks first, so a rejected observer
+        # leaves every rank as it was
+        ranks = dict()
+        stack = [(observer, rank)]
+        while stack:
+            node, rank = stack.pop()
+            if node is self:
+                raise ValueError("observers would form a cycle")
+            if ranks.get(node, node._rank) >= rank:
+                continue
+            ranks[node] = rank
+            for dependent in node._observers:
+                if isinstance(dependent, Observable):
+                    stack.append((dependent, rank + 1))
+        for node, rank in ranks.items():
+            node._rank = rank
+
+    @synchronized
     def remove_observer(self, observer):
-        self._observers.discard(observer)
+        observer_refs = self._observer_refs
+        if observer_refs is None:
+            return
+        if type(observer_refs) is ref:
+            if observer_refs() is observer:
+                self._observer_refs = None
+        else:
+            observer_refs.discard(observer)
 
     def notify_observers(self):
-        for observer in self._observers:
-            observer.observable_update(self)
+        if self._observer_refs is None:
+            return
+        if Observable._batch_depth:
+            Observable._pending[self] = None
+            return
+        observer_refs = self._observer_refs
+        if type(observer_refs) is ref:
+            # along a chain of single observers the call order is
+            # already topological, only fan out needs the graph
+            observer = observer_refs()
+            if observer is not None:
+                observer.observable_update(self)
+            return
+        # propagate through the graph as a batch of one
+        Observable._batch_depth = 1
+        Observable._pending = OrderedDict(((self, None),))
+        try:
+            Observable._flush()
+        finally:
+            Observable._batch_depth = 0
+            Observable._pending = None
+
+    @staticmethod
+    @contextmanager
+    def batch_updates():
+        """ Defer notifications until the outermost batch closes.
+            Each dirty observer is then updated exactly once.
+            With thread safety enabled the whole batch holds the lock.
+        """
+        with Observable.locked():
+            if not Observable._batch_depth:
+                Observable._pending = OrderedDict()
+            Observable._batch_depth += 1
+            try:
+                yield
+            finally:
+                try:
+                    if Observable._batch_depth == 1:
+                        Observable._flush()
+                finally:
+                    Observable._batch_depth -= 1
+                    if not Observable._batch_depth:
+                        Observable._pending = None
+
+    @staticmethod
+    def _flush():
+        """ Deliver pending notifications in rank order, so each
+            observer is updated once, after everything it observes.
+            Observers of equal rank cannot depend on one another and
+            are updated together. Observers that are not themselves
+            observable have nothing downstream and are updated last.
+            An observable that notifies again within the flush is
+            passed to each observer at most once.
+        """
+        pending = Observable._pending
+        updates = dict()
+        ranks = dict()
+        # an observable changed in the batch may notify again once it is
+        # updated itself (e.g. a portfolio that then revalues), it is
+        # still passed to each of its observers once
+        routed = set()
+        while True:
+            for observable in pending:
+                renotified = observable in routed
+                if not renotified:
+                    routed.add(observable)
+                for observer in observable._observers:
+                    observables = updates.get(observer)
+                    if observables is None:
+                        updates[observer] = [observable]
+                        rank = getattr(observer, "_rank", _SINK_RANK)
+                        observers = ranks.get(rank)
+                        if observers is None:
+                            ranks[rank] = [observer]
+                        else:
+                            observers.append(observer)
+                    elif not renotified or observable not in observables:
+                        observables.append(observable)
+            pending.clear()
+            if not ranks:
+                break
+
+            for observer in ranks.pop(min(ranks)):
+                observables = updates.pop(observer)
+                batch_update = getattr(
+                    observer, "observable_batch_update", None
+                )
+                if batch_update is not None:
+                    batch_update(observables)
+                else:
+                    for observable in observables:
+                        observer.observable_update(observable)
+
+
+# observers that are not observable are updated after all that are
+_SINK_RANK = float("inf")
@@ -0,0 +1,74 @@
+"""
+Run independent backtest scenarios across a pool of processes.
+
+Market data is written once to a tick file that every worker memory
+maps, so ticks are shared through the page cache rather than pickled
+for each task. Each task starts from empty asset and fx registries so
+scenarios cannot see each other's assets.
+"""
+import os
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from .assets import MarketContext
+from .backtest import Backtest
+from .tickfile import TickFile, write_ticks
+
+
+# tick files opened by this worker process, by path
+_tick_files = dict()
+
+
+def _get_tick_file(path):
+    tick_file = _tick_files.get(path)
+    if tick_file is None:
+        tick_file = _tick_files[path] = TickFile(path)
+    return tick_file
+
+
+def _reset_registries():
+    MarketContext.default().clear()
+
+
+def _run_scenario(path, setup, params):
+    _reset_registries()
+    try:
+        portfolio, actors = setup(params)
+        backtest = Backtest(iter(_get_tick_file(path)))
+        backtest.add_portfolio(portfolio)
+        for actor in actors:
+            backtest.add_actor(actor)
+        backtest.run()
+        return backtest.timestamps, backtest.get_values(portfolio)
+    finally:
+        _reset_registries()
+
+
+def run_scenarios(setup, scenarios, ticks, max_workers=None):
+    """ Backtest each scenario in a separate process.
+
+        setup is called in the worker with the scenario's parameters
+        and must return a (portfolio, actors) tuple, creating every
+        asset and fx rate the ticks refer to. Ticks must be in
+        timestamp order. setup must be picklable,
+        i.e. a module level function.
+
+        Returns (timestamps, values) where values holds the array of
+        portfolio values for each scenario, in order.
+    """
+    handle, path = tempfile.mkstemp(suffix=".ticks")
+    os.close(handle)
+    try:
+        write_ticks(path, ticks)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_run_scenario, path, setup, params)
+                for params in scenarios
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        os.remove(path)
+
+    # every scenario steps through the same timestamps
+    timestamps = results[0][0] if results else array("d")
+    return timestamps, [values for _, values in results]
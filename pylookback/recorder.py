@@ -0,0 +1,84 @@
+"""
+Record a portfolio's value each time it is revalued.
+Values are written into preallocated arrays (growable or fixed size
+rings) rather than lists of Python objects, and are returned as
+array.array instances which support the buffer protocol (so can be
+wrapped without copying, e.g. by numpy.frombuffer).
+"""
+import time
+from .assets import Portfolio
+from .buffers import GrowableArray, RingArray
+
+
+class Recorder:
+    """ Observe a portfolio and append (timestamp, value, holding values)
+        whenever it notifies us of a change.
+
+        capacity:   the initial number of records (or the ring size)
+        ring:       keep only the last capacity records
+        clock:      returns the timestamp to record, e.g. a backtest's
+                    current timestamp
+        codes:      the holdings whose values to record, by default the
+                    holdings in the portfolio when recording starts,
+                    in code order
+    """
+
+    def __init__(
+        self, portfolio, capacity=1024, ring=False, clock=time.time, codes=None
+    ):
+        if not isinstance(portfolio, Portfolio):
+            raise TypeError("expected portfolio instance")
+        self._portfolio = portfolio
+        self._clock = clock
+        buffer_type = RingArray if ring else GrowableArray
+
+        if codes is None:
+            # sorted, so the columns do not depend on dict order
+            codes = sorted(portfolio.holding_codes())
+        self._codes = tuple(str(code).strip().upper() for code in codes)
+        self._timestamps = buffer_type("d", capacity)
+        self._values = buffer_type("d", capacity)
+        self._holding_values = [
+            buffer_type("d", capacity) for _ in self._codes
+        ]
+        portfolio.add_observer(self)
+
+    @property
+    def portfolio(self):
+        return self._portfolio
+
+    @property
+    def codes(self):
+        return self._codes
+
+    def observable_update(self, observable):
+        self.record()
+
+    def record(self):
+        """ Record the portfolio as it is now. """
+        portfolio = self._portfolio
+        self._timestamps.append(self._clock())
+        self._values.append(portfolio.value)
+        for code, values in zip(self._codes, self._holding_values):
+            values.append(portfolio.get_holding_value(code))
+
+    def stop(self):
+        """ Stop recording changes. """
+        self._portfolio.remove_observer(self)
+
+    @property
+    def timestamps(self):
+        return self._timestamps.to_array()
+
+    @property
+    def values(self):
+        return self._values.to_array()
+
+    def get_holding_values(self, code):
+        code = str(code).strip().upper()
+        if code not in self._codes:
+            raise ValueError("%s is not recorded" % code)
+        return self._holding_values[self._codes.index(code)].to_array()
+
+    def __len__(self):
+        return len(self._timestamps)
@@ -0,0 +1,92 @@
+"""
+A weak valued registry for objects identified by a unique string key.
+Lookups and existence checks are O(1) and an ordered view of the keys
+is maintained incrementally as objects are registered and collected.
+"""
+from bisect import bisect_left, insort
+from weakref import KeyedRef, ref
+
+
+class Registry:
+    """ Map unique keys to weakly referenced objects.
+        Once an object is garbage collected its key is released
+        and can be registered again. The optional on_release callable
+        is called with each key as it is released.
+    """
+
+    def __init__(self, on_release=None):
+        self._refs = dict()
+        self._ordered_keys = list()
+        self._on_release = on_release
+        self._callback = self._make_callback()
+
+    def register(self, key, obj):
+        """ Register obj under a key that must not already be in use. """
+        obj_ref = self._refs.get(key)
+        if obj_ref is not None:
+            if obj_ref() is not None:
+                raise ValueError("%s is already in use" % key)
+            # collected but its callback has not run yet
+            self._release(key, obj_ref)
+        self._refs[key] = KeyedRef(obj, self._callback, key)
+        insort(self._ordered_keys, key)
+
+    def _make_callback(self):
+        # hold the registry weakly so a dropped registry can be collected
+        registry_ref = ref(self)
+
+        def callback(obj_ref):
+            registry = registry_ref()
+            if registry is not None:
+                registry._release(obj_ref.key, obj_ref)
+
+        return callback
+
+    def _release(self, key, obj_ref):
+        # only release the key if it still refers to the collected object
+        if self._refs.get(key) is not obj_ref:
+            return
+        del self._refs[key]
+        index = bisect_left(self._ordered_keys, key)
+        del self._ordered_keys[index]
+        if self._on_release is not None:
+            self._on_release(key)
+
+    def unregister(self, key):
+        """ Release a key while its object is still alive. """
+        obj_ref = self._refs.get(key)
+        if obj_ref is not None:
+            self._release(key, obj_ref)
+
+    def clear(self):
+        """ Release every key. """
+        for key in self.keys():
+            self._release(key, self._refs[key])
+
+    def get(self, key, default=None):
+        obj_ref = self._refs.get(key)
+        if obj_ref is None:
+            return default
+        obj = obj_ref()
+        if obj is None:
+            return default
+        return obj
+
+    def keys(self):
+        """ Return the registered keys in sorted order. """
+        return tuple(self._ordered_keys)
+
+    def values(self):
+        for key in self._ordered_keys:
+            obj = self.get(key)
+            if obj is not None:
+                yield obj
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._ordered_keys)
+
+    def __iter__(self):
+        return iter(self.keys())
@@ -0,0 +1,192 @@
+"""
+Save and restore every asset, fx rate and portfolio.
+
+Restoring a snapshot recreates objects directly from their saved state
+(prices, rates, units and the values cached by holdings and portfolios)
+rather than through the validating constructors, and without revaluing
+anything or notifying observers. A snapshot file is laid out as:
+
+    header:   magic (8 bytes), metadata size (int64)
+    metadata: utf-8 json describing the objects (types, codes and
+              currencies)
+    columns:  float64 numbers, asset prices and local values, rates,
+              then units, local values and base values for the holdings
+              of each portfolio
+
+Numbers are stored in native byte order. A snapshot holds the objects
+registered in one market context (the default unless one is given)
+and is restored into a context.
+"""
+import json
+import struct
+from array import array
+from collections import namedtuple
+from itertools import islice
+from .assets import (
+    ArrayPortfolio,
+    Cash,
+    FxRate,
+    MarketContext,
+    Portfolio,
+    Stock,
+)
+
+
+MAGIC = b"PLBSNAP1"
+_HEADER = struct.Struct("=8sq")
+
+DEFAULT_ASSET_TYPES = (Stock, Cash)
+DEFAULT_PORTFOLIO_TYPES = (Portfolio, ArrayPortfolio)
+
+# the restored objects, which must be held on to as the registries only
+# hold them weakly
+Snapshot = namedtuple("Snapshot", ["assets", "fx_rates", "portfolios"])
+
+
+def save_snapshot(path, portfolios=(), context=None):
+    """ Save every registered asset and fx rate, every registered
+        portfolio and any other portfolios given.
+    """
+    context = MarketContext.resolve(context)
+    assets = list()
+    saved_portfolios = list()
+    for asset in context.assets():
+        if isinstance(asset, Portfolio):
+            saved_portfolios.append(asset)
+        else:
+            assets.append(asset)
+    for portfolio in portfolios:
+        if not isinstance(portfolio, Portfolio):
+            raise TypeError("expected portfolio instance")
+        if portfolio.context is not context:
+            raise ValueError("portfolio is in another market context")
+        if not any(portfolio is saved for saved in saved_portfolios):
+            saved_portfolios.append(portfolio)
+    # held portfolios are ranked below, and so restored before, holders
+    saved_portfolios.sort(key=lambda portfolio: portfolio.rank)
+    fx_rates = list(context.fx_rates())
+
+    columns = array("d")
+    columns.extend(asset.price for asset in assets)
+    columns.extend(asset.local_value for asset in assets)
+    columns.extend(fx_rate.rate for fx_rate in fx_rates)
+    portfolio_metadata = list()
+    for portfolio in saved_portfolios:
+        holdings = list(portfolio._snapshot_holdings())
+        for column in range(1, 4):
+            columns.extend(holding[column] for holding in holdings)
+        portfolio_metadata.append(
+            {
+                "type": type(portfolio).__name__,
+                "code": portfolio.code,
+                "base_currency_code": portfolio.base_currency_code,
+                "lazy": portfolio.lazy,
+                "codes": [holding[0] for holding in holdings],
+            }
+        )
+
+    metadata = json.dumps(
+        {
+            "assets": [
+                [type(asset).__name__, asset.code, asset.currency_code]
+                for asset in assets
+            ],
+            "fx_rates": [fx_rate.currency_pair for fx_rate in fx_rates],
+            "portfolios": portfolio_metadata,
+        }
+    ).encode("utf-8")
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, len(metadata)))
+        file.write(metadata)
+        columns.tofile(file)
+
+
+def restore_snapshot(path, asset_types=(), portfolio_types=(), context=None):
+    """ Restore a snapshot, returning the restored objects.
+        Types other than the defaults must be passed to be restored.
+        No asset code or currency pair in the snapshot may already
+        be registered.
+    """
+    context = MarketContext.resolve(context)
+    with open(path, "rb") as file:
+        magic, size = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("%s is not a snapshot" % path)
+        metadata = json.loads(file.read(size).decode("utf-8"))
+        columns = array("d")
+        columns.frombytes(file.read())
+
+    # check everything can be restored before restoring anything
+    asset_types = _get_types(DEFAULT_ASSET_TYPES + tuple(asset_types))
+    asset_classes = [
+        _get_type(asset_types, type_name)
+        for type_name, _, _ in metadata["assets"]
+    ]
+    portfolio_types = _get_types(
+        DEFAULT_PORTFOLIO_TYPES + tuple(portfolio_types)
+    )
+    portfolio_classes = [
+        _get_type(portfolio_types, description["type"])
+        for description in metadata["portfolios"]
+    ]
+    _check_not_registered(metadata, context)
+
+    numbers = iter(columns)
+    asset_count = len(metadata["assets"])
+    prices = list(islice(numbers, asset_count))
+    local_values = list(islice(numbers, asset_count))
+    assets = [
+        cls._restore(code, currency_code, price, local_value, context)
+        for cls, (_, code, currency_code), price, local_value in zip(
+            asset_classes, metadata["assets"], prices, local_values
+        )
+    ]
+
+    fx_rates = [
+        FxRate._restore(currency_pair, rate, context)
+        for currency_pair, rate in zip(metadata["fx_rates"], numbers)
+    ]
+    context.clear_paths()
+
+    portfolios = list()
+    for cls, description in zip(portfolio_classes, metadata["portfolios"]):
+        kwargs = {"code": description["code"], "context": context}
+        if description["lazy"]:
+            kwargs["lazy"] = True
+        portfolio = cls(description["base_currency_code"], **kwargs)
+        count = len(description["codes"])
+        held_assets = map(context.get_asset, description["codes"])
+        units = list(islice(numbers, count))
+        holding_locals = list(islice(numbers, count))
+        holding_bases = list(islice(numbers, count))
+        portfolio._restore_holdings(
+            zip(held_assets, units, holding_locals, holding_bases)
+        )
+        portfolios.append(portfolio)
+    return Snapshot(assets, fx_rates, portfolios)
+
+
+def _get_types(types):
+    return {cls.__name__: cls for cls in types}
+
+
+def _get_type(types, type_name):
+    cls = types.get(type_name)
+    if cls is None:
+        raise ValueError("unknown type %s" % type_name)
+    return cls
+
+
+def _check_not_registered(metadata, context):
+    codes = [code for _, code, _ in metadata["assets"]]
+    codes.extend(
+        description["code"]
+        for description in metadata["portfolios"]
+        if description["code"] is not None
+    )
+    for code in codes:
+        if context.asset_code_exists(code):
+            raise ValueError("%s is already registered" % code)
+    for currency_pair in metadata["fx_rates"]:
+        if context.currency_pair_exists(currency_pair):
+            raise ValueError("%s is already registered" % currency_pair)
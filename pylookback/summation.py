@@ -0,0 +1,89 @@
+"""
+Exact running sums for values that are updated by deltas.
+Floats are accumulated as non-overlapping partials (Shewchuk's
+algorithm, as used by math.fsum) so adding and later removing a
+value leaves no rounding error behind. Infinities and nans are
+counted rather than summed, so they can be removed again too.
+"""
+from math import fsum, inf, isfinite, nan
+
+
+class RunningSum:
+    """ Keep a correctly rounded sum of everything added so far.
+    >>> total = RunningSum()
+    >>> total.add(0.1)
+    >>> total.add(0.2)
+    >>> total.add(-0.1)
+    >>> total.value
+    0.2
+    """
+
+    def __init__(self, values=()):
+        self.reset(values)
+
+    def reset(self, values=()):
+        """ Discard the partials and start again from an exact sum. """
+        self._partials = []
+        self._nans = 0
+        self._infs = 0
+        self._negative_infs = 0
+        self._value = 0.0
+        for value in values:
+            self._add(value)
+        self._value = self._total()
+
+    def add(self, x):
+        self._add(x)
+        self._value = self._total()
+
+    def replace(self, old, new):
+        """ Swap a previously added value for a new one. """
+        self._add(new)
+        if isfinite(old):
+            self._add(-old)
+        else:
+            self._discard(old)
+        self._value = self._total()
+
+    def _add(self, x):
+        if not isfinite(x):
+            # infinities and nans cannot be held as partials
+            if x != x:
+                self._nans += 1
+            elif x > 0:
+                self._infs += 1
+            else:
+                self._negative_infs += 1
+            return
+        partials = self._partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def _discard(self, x):
+        """ Remove a previously added infinity or nan. """
+        if x != x:
+            self._nans -= 1
+        elif x > 0:
+            self._infs -= 1
+        else:
+            self._negative_infs -= 1
+
+    def _total(self):
+        if self._nans or self._infs or self._negative_infs:
+            if self._nans or (self._infs and self._negative_infs):
+                return nan
+            return inf if self._infs else -inf
+        return fsum(self._partials)
+
+    @property
+    def value(self):
+        return self._value
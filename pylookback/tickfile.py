@@ -0,0 +1,141 @@
+"""
+A compact columnar file format for ticks.
+
+    header:  magic (8 bytes), footer offset (int64)
+    chunks:  count (int64), timestamps (float64 * count),
+             code indices (int64 * count), values (float64 * count)
+    footer:  the code table, utf-8 encoded and newline separated
+
+Numbers are stored in native byte order. Ticks are written in chunks
+so that memory use is bounded by the chunk size, and files are read
+through a memory map so chunks are zero-copy views of the file.
+"""
+import mmap
+import struct
+from array import array
+from .backtest import Tick
+
+
+MAGIC = b"PLBTICK1"
+_HEADER = struct.Struct("=8sq")
+_COUNT = struct.Struct("=q")
+
+
+class TickWriter:
+    """ Write ticks to a file, one chunk at a time. """
+
+    def __init__(self, path, chunk_size=65536):
+        if not isinstance(chunk_size, int):
+            raise TypeError("chunk_size must be int")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, 0))
+        self._chunk_size = chunk_size
+        self._codes = list()
+        self._code_indices = dict()
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._timestamps = array("d")
+        self._indices = array("q")
+        self._values = array("d")
+
+    def write(self, tick):
+        timestamp, code, value = tick
+        index = self._code_indices.get(code)
+        if index is None:
+            if "\n" in code:
+                raise ValueError("codes cannot contain newlines")
+            index = self._code_indices[code] = len(self._codes)
+            self._codes.append(code)
+        self._timestamps.append(timestamp)
+        self._indices.append(index)
+        self._values.append(value)
+        if len(self._timestamps) == self._chunk_size:
+            self._flush()
+
+    def write_all(self, ticks):
+        for tick in ticks:
+            self.write(tick)
+
+    def _flush(self):
+        if not self._timestamps:
+            return
+        self._file.write(_COUNT.pack(len(self._timestamps)))
+        self._timestamps.tofile(self._file)
+        self._indices.tofile(self._file)
+        self._values.tofile(self._file)
+        self._new_chunk()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush()
+        footer_offset = self._file.tell()
+        self._file.write("\n".join(self._codes).encode("utf-8"))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, footer_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_ticks(path, ticks, chunk_size=65536):
+    """ Write an iterable of ticks to path. """
+    with TickWriter(path, chunk_size) as writer:
+        writer.write_all(ticks)
+
+
+class TickFile:
+    """ Read a tick file through a memory map. """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        magic, footer_offset = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or footer_offset < _HEADER.size:
+            self.close()
+            raise ValueError("%s is not a complete tick file" % path)
+        self._footer_offset = footer_offset
+        footer = bytes(self._buffer[footer_offset:]).decode("utf-8")
+        self._codes = tuple(footer.split("\n")) if footer else ()
+
+    @property
+    def codes(self):
+        return self._codes
+
+    def chunks(self):
+        """ Generate (timestamps, code indices, values) memoryviews. """
+        buffer = self._buffer
+        offset = _HEADER.size
+        while offset < self._footer_offset:
+            (count,) = _COUNT.unpack_from(buffer, offset)
+            offset += _COUNT.size
+            columns = []
+            for typecode in ("d", "q", "d"):
+                end = offset + 8 * count
+                columns.append(buffer[offset:end].cast(typecode))
+                offset = end
+            yield tuple(columns)
+
+    def __iter__(self):
+        codes = self._codes
+        for timestamps, indices, values in self.chunks():
+            for timestamp, index, value in zip(timestamps, indices, values):
+                yield Tick(timestamp, codes[index], value)
+
+    def close(self):
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
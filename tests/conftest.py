@@ -0,0 +1,16 @@
+import pytest
+
+
+class Counter:
+    """ An observer that counts its updates. """
+
+    def __init__(self):
+        self.count = 0
+
+    def observable_update(self, observable):
+        self.count += 1
+
+
+@pytest.fixture
+def counter():
+    return Counter()
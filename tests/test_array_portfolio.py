@@ -0,0 +1,139 @@
+from pylookback.assets import (
+    ArrayPortfolio,
+    Asset,
+    Portfolio,
+    Stock,
+    Cash,
+    FxRate,
+)
+
+
+def test_array_portfolio_init():
+    portfolio = ArrayPortfolio("AUD")
+    assert portfolio.base_currency_code == "AUD"
+    assert portfolio.value == 0
+
+
+def test_transfer():
+    portfolio = ArrayPortfolio("AUD")
+    aud = Cash("AUD")
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    aapl = Stock("AAPL US", 300, "USD")
+    audusd = FxRate("AUDUSD", 0.65)
+
+    portfolio.transfer(aud, 1000)
+    portfolio.transfer(zzb, 1000)
+    assert portfolio.value == 1000 + 1000 * 2.50
+
+    portfolio.transfer(aapl, 1000)
+    assert portfolio.value == 1000 + 1000 * 2.50 + 1000 * 300 / audusd.rate
+
+    portfolio.transfer(aapl, -1000)
+    assert portfolio.value == 1000 + 1000 * 2.50
+    assert portfolio.get_holding_units("AAPL US") == 0
+    assert portfolio.get_holding_units("zzb au") == 1000
+
+
+def test_prices_and_rates_observed():
+    portfolio = ArrayPortfolio("AUD")
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    aapl = Stock("AAPL US", 300, "USD")
+    audusd = FxRate("AUDUSD", 0.65)
+    portfolio.transfer(zzb, 1000)
+    portfolio.transfer(aapl, 1000)
+
+    zzb.price = 2
+    aapl.price = 310
+    audusd.rate = 0.75
+    expected_value = 1000 * 2 + 1000 * 310 / 0.75
+    assert round(portfolio.value, 6) == round(expected_value, 6)
+
+    Asset.update_prices({"ZZB AU": 3, "AAPL US": 320})
+    expected_value = 1000 * 3 + 1000 * 320 / 0.75
+    assert round(portfolio.value, 6) == round(expected_value, 6)
+
+
+def test_matches_portfolio():
+    array_portfolio = ArrayPortfolio("AUD")
+    portfolio = Portfolio("AUD")
+    audusd = FxRate("AUDUSD", 0.65)
+    stocks = [Stock("ZZ%d US" % i, 1.0 + i, "USD") for i in range(10)]
+    for units, stock in enumerate(stocks):
+        for book in (array_portfolio, portfolio):
+            book.transfer(stock, units + 1)
+            book.trade(stock, -1)
+
+    audusd.rate = 0.7
+    for stock in stocks:
+        stock.price *= 1.1
+    assert array_portfolio.value == portfolio.value
+    assert array_portfolio.get_holding_units("USD") == (
+        portfolio.get_holding_units("USD")
+    )
+
+
+def test_cross_rates_observed():
+    portfolio = ArrayPortfolio("EUR")
+    aaa = Stock("AAA JP", 1000, "JPY")
+    eurusd = FxRate("EURUSD", 1.25)
+    usdjpy = FxRate("USDJPY", 100.0)
+    portfolio.transfer(aaa, 10)
+    assert portfolio.value == 10 * 1000 / 125.0
+
+    usdjpy.rate = 80.0
+    assert portfolio.value == 10 * 1000 / 100.0
+    eurusd.rate = 1.6
+    assert portfolio.value == 10 * 1000 / 128.0
+
+
+def test_direct_pair_created_after_cross_rate():
+    toy = Stock("TOY JP", 100.0, "JPY")
+    eurusd = FxRate("EURUSD", 0.5)
+    usdjpy = FxRate("USDJPY", 100.0)
+    portfolios = [Portfolio("EUR"), Portfolio("EUR", lazy=True)]
+    portfolios.append(ArrayPortfolio("EUR"))
+    for portfolio in portfolios:
+        portfolio.transfer(toy, 1)
+        assert portfolio.value == 2.0
+
+    # the holdings move from the legs to the new pair
+    eurjpy = FxRate("EURJPY", 40.0)
+    assert [portfolio.value for portfolio in portfolios] == [2.5] * 3
+    eurjpy.rate = 25.0
+    assert [portfolio.value for portfolio in portfolios] == [4.0] * 3
+    eurusd.rate = 0.25
+    usdjpy.rate = 50.0
+    toy.price = 50.0
+    assert [portfolio.value for portfolio in portfolios] == [2.0] * 3
+
+
+def test_currency_exposures():
+    array_portfolio = ArrayPortfolio("AUD")
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    aud = Cash("AUD")
+    for book in (array_portfolio, portfolio):
+        book.transfer(aud, 1000)
+        book.transfer(zzb, 100)
+        book.trade(aapl, 3)
+
+    aapl.price = 110.0
+    audusd.rate = 0.25
+    for book in (array_portfolio, portfolio):
+        assert book.local_exposures() == {"AUD": 1200, "USD": 30}
+        assert book.currency_exposures() == {"AUD": 1200, "USD": 120}
+        assert book.get_currency_exposure("USD") == 120
+        assert book.cash_by_currency() == {"AUD": 1000, "USD": -300}
+
+
+def test_values_in():
+    portfolio = ArrayPortfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 100)
+    portfolio.transfer(aapl, 2)
+    audusd.rate = 0.25
+    assert portfolio.values_in(["AUD", "USD"]) == {"AUD": 1000, "USD": 250}
@@ -63,3 +63,21 @@ def test_get_asset_by_code():
     assert instance is zzb
     with pytest.raises(ValueError):
         Asset.get_asset_by_code("ZZZ")
+
+
+def test_update_prices():
+    aaa = Stock("ZZC AU", 2.50, "AUD")
+    bbb = Stock("ZZD AU", 3.50, "AUD")
+    Asset.update_prices({"ZZC AU": 2.60, "ZZD AU": 3.60})
+    assert aaa.price == aaa.local_value == 2.60
+    assert bbb.price == bbb.local_value == 3.60
+
+    with pytest.raises(ValueError):
+        Asset.update_prices({"ZZZ": 1.0})
+
+
+def test_slots():
+    stock = Stock("ZZE AU", 2.50, "AUD")
+    assert not hasattr(stock, "__dict__")
+    with pytest.raises(AttributeError):
+        stock.nickname = "zze"
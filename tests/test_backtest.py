@@ -0,0 +1,86 @@
+import pytest
+from pylookback.actors.actor import Actor, Strategy
+from pylookback.assets import Portfolio, Stock, Cash, FxRate
+from pylookback.backtest import Backtest, Tick, iter_steps
+
+
+def test_iter_steps():
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    audusd = FxRate("AUDUSD", 0.65)
+
+    ticks = [
+        Tick(1, "ZZB AU", 2.6),
+        Tick(1, "AUDUSD", 0.66),
+        Tick(2, "ZZB AU", 2.7),
+    ]
+    steps = list(iter_steps(iter(ticks)))
+    assert steps == [
+        (1, {"ZZB AU": 2.6}, {"AUDUSD": 0.66}),
+        (2, {"ZZB AU": 2.7}, {}),
+    ]
+    # the ticks are only grouped, nothing is applied
+    assert zzb.price == 2.50
+    assert audusd.rate == 0.65
+
+    with pytest.raises(ValueError):
+        list(iter_steps([Tick(2, "ZZB AU", 2.6), Tick(1, "ZZB AU", 2.7)]))
+
+
+def test_backtest_records_values():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    aapl = Stock("AAPL US", 300, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 100)
+    portfolio.transfer(aapl, 1)
+
+    def ticks():
+        yield Tick(1, "ZZB AU", 3.0)
+        yield Tick(2, "AAPL US", 310)
+        yield Tick(2, "AUDUSD", 0.625)
+
+    backtest = Backtest(ticks(), capacity=1)
+    backtest.add_portfolio(portfolio)
+    backtest.run()
+
+    assert list(backtest.timestamps) == [1, 2]
+    assert list(backtest.get_values(portfolio)) == [900, 796]
+    assert audusd.rate == 0.625
+
+    with pytest.raises(ValueError):
+        backtest.get_values(Portfolio("AUD"))
+
+
+class BuyEachStep(Strategy):
+    def __init__(self, portfolio, asset):
+        self.portfolio = portfolio
+        self.asset = asset
+
+    def run(self):
+        self.portfolio.trade(self.asset, 1)
+
+
+def test_backtest_actors_perform():
+    portfolio = Portfolio("AUD")
+    aud = Cash("AUD")
+    zzb = Stock("ZZB AU", 1.0, "AUD")
+    portfolio.transfer(aud, 100)
+
+    actor = Actor(portfolio, BuyEachStep(portfolio, zzb))
+    ticks = [Tick(t, "ZZB AU", float(t)) for t in range(1, 4)]
+    backtest = Backtest(ticks)
+    backtest.add_actor(actor)
+
+    timestamps = []
+    for timestamp in backtest.steps():
+        assert backtest.timestamp == timestamp
+        timestamps.append(timestamp)
+    assert timestamps == [1, 2, 3]
+
+    # bought at 1, 2 and 3 and finally valued at 3
+    assert portfolio.get_holding_units("ZZB AU") == 3
+    assert portfolio.get_holding_units("AUD") == 100 - 1 - 2 - 3
+    assert list(backtest.get_values(portfolio)) == [100, 101, 103]
+
+    with pytest.raises(ValueError):
+        backtest.add_portfolio(Portfolio("AUD"))
@@ -0,0 +1,86 @@
+import pytest
+from pylookback.actors.compliance import (
+    Compliance,
+    ConcentrationLimit,
+    CurrencyExposureCap,
+    MaxGrossExposure,
+    NoShortPositions,
+)
+from pylookback.assets import Cash, FxRate, Portfolio, Stock
+
+
+def breached(breaches):
+    return sorted((type(b.rule).__name__, b.code) for b in breaches)
+
+
+def test_compliance():
+    portfolio = Portfolio("AUD")
+    aud = Cash("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(aud, 1000)
+    portfolio.transfer(zzb, 100)
+    portfolio.transfer(aapl, 1)
+    assert portfolio.value == 1400
+
+    compliance = Compliance(
+        portfolio,
+        [
+            ConcentrationLimit(0.2),
+            CurrencyExposureCap("usd", 0.15),
+            NoShortPositions(),
+        ],
+    )
+    compliance.add_rule(MaxGrossExposure(0.5))
+    with pytest.raises(TypeError):
+        compliance.add_rule(object())
+    assert len(compliance.rules) == 4
+    assert compliance.check() == []
+    assert compliance.is_allowed(zzb, 10)
+
+    assert breached(compliance.check_trade(zzb, 100)) == [
+        ("ConcentrationLimit", "ZZB AU")
+    ]
+    # buying with borrowed usd leaves the usd exposure unchanged
+    assert compliance.is_allowed(aapl, 0.25)
+    assert breached(compliance.check_trade(aapl, 0.25, 0)) == [
+        ("CurrencyExposureCap", "USD")
+    ]
+    assert breached(compliance.check_trade(zzb, -150)) == [
+        ("NoShortPositions", "ZZB AU")
+    ]
+    assert breached(compliance.check_trade(zzb, 200)) == [
+        ("ConcentrationLimit", "ZZB AU"),
+        ("MaxGrossExposure", None),
+    ]
+    (breach,) = compliance.check_trade(zzb, -150)
+    assert breach.value == -50 and breach.limit == 0
+
+    # each pre trade check agrees with the check after trading
+    candidates = [
+        (zzb, 100, None),
+        (aapl, 0.25, 0),
+        (aapl, 1, 0),
+        (zzb, -150, None),
+        (zzb, 200, None),
+        (aapl, -2, None),
+        (aud, -2000, 0),
+    ]
+    for asset, units, consideration in candidates:
+        trade = (asset, units, consideration)
+        expected = breached(compliance.check_trade(*trade))
+        if consideration is None:
+            consideration = -asset.local_value * units
+        portfolio.trade(asset, units, consideration)
+        compliance.perform()
+        assert breached(compliance.breaches) == expected
+        portfolio.trade(asset, -units, -consideration)
+        assert compliance.check() == []
+
+    audusd.rate = 0.1  # a rate move breaches post trade
+    assert breached(compliance.check()) == [
+        ("ConcentrationLimit", "AAPL US"),
+        ("CurrencyExposureCap", "USD"),
+        ("MaxGrossExposure", None),
+    ]
@@ -0,0 +1,141 @@
+import pytest
+from pylookback.assets import (
+    ArrayPortfolio,
+    Asset,
+    Cash,
+    FxRate,
+    MarketContext,
+    Portfolio,
+    Stock,
+)
+
+
+def test_contexts_are_independent():
+    market = MarketContext()
+    other = MarketContext()
+    assert MarketContext.resolve(None) is MarketContext.default()
+    with pytest.raises(TypeError):
+        MarketContext.resolve("market")
+
+    zzb = Stock("ZZB AU", 2.0, "AUD", context=market)
+    other_zzb = Stock("ZZB AU", 3.0, "AUD", context=other)
+    assert zzb.context is market
+    assert market.get_asset("ZZB AU") is zzb
+    assert other.get_asset("ZZB AU") is other_zzb
+    assert not Asset.asset_code_exists("ZZB AU")
+    with pytest.raises(ValueError):
+        Stock("ZZB AU", 2.0, "AUD", context=market)
+
+    audusd = FxRate("AUDUSD", 0.5, context=market)
+    assert market.get_rate("USDAUD") == 2.0
+    assert not FxRate.currency_pair_exists("AUDUSD")
+    with pytest.raises(ValueError):
+        other.get_rate("AUDUSD")
+
+    portfolio = Portfolio("USD", context=market)
+    portfolio.transfer(zzb, 10)
+    portfolio.trade(zzb, 10)
+    assert portfolio.value == 10
+    assert portfolio.get_holding_units("AUD") == -20
+    assert market.get_asset("AUD").context is market
+    with pytest.raises(ValueError):
+        portfolio.transfer(other_zzb, 1)
+    audusd.rate = 0.25
+    assert portfolio.value == 5
+
+
+def test_fork_prices():
+    market = MarketContext()
+    zzb = Stock("ZZB AU", 2.0, "AUD", context=market)
+    aapl = Stock("AAPL US", 100.0, "USD", context=market)
+    audusd = FxRate("AUDUSD", 0.5, context=market)
+    book = Portfolio("AUD", context=market)
+    book.transfer(zzb, 100)
+    book.transfer(aapl, 1)
+    assert book.value == 400
+
+    scenario = market.fork()
+    assert scenario.parent is market
+    assert scenario.get_asset("AAPL US") is aapl
+    assert scenario.registered_codes() == ["AAPL US", "ZZB AU"]
+    scenario_book = Portfolio("AUD", context=scenario)
+    scenario_book.transfer(zzb, 100)
+    scenario_book.transfer(scenario.get_asset("AAPL US"), 1)
+
+    # the fork reads through to its parent until it sets a price
+    aapl.price = 110.0
+    assert book.value == scenario_book.value == 420
+    scenario.set_price("AAPL US", 50.0)
+    scenario_aapl = scenario.get_asset("AAPL US")
+    assert scenario_aapl is not aapl and scenario_aapl.price == 50.0
+    assert aapl.price == 110.0
+    assert book.value == 420
+    assert scenario_book.value == 300
+
+    aapl.price = 120.0
+    zzb.price = 3.0
+    assert book.value == 540
+    assert scenario_book.value == 400
+    scenario.update_prices({"AAPL US": 60.0, "ZZB AU": 1.0})
+    assert scenario_book.value == 220
+    assert zzb.price == 3.0 and book.value == 540
+    with pytest.raises(ValueError):
+        scenario_book.transfer(aapl, 1)
+
+    # without a rate of its own the fork follows its parent's
+    audusd.rate = 0.25
+    assert book.value == 300 + 120 / 0.25
+    assert scenario_book.value == 100 + 60 / 0.25
+
+
+def test_fork_rates():
+    market = MarketContext()
+    aaa = Stock("AAA JP", 1000.0, "JPY", context=market)
+    eurusd = FxRate("EURUSD", 1.25, context=market)
+    usdjpy = FxRate("USDJPY", 100.0, context=market)
+    book = Portfolio("EUR", context=market)
+    book.transfer(aaa, 10)
+    assert book.value == 80
+
+    scenario = market.fork()
+    scenario_book = Portfolio("EUR", context=scenario)
+    scenario_book.transfer(aaa, 10)
+    usdjpy.rate = 80.0
+    assert book.value == scenario_book.value == 100
+    assert scenario.get_rate("EURJPY") == 100.0
+
+    scenario.set_rate("USDJPY", 50.0)
+    assert usdjpy.rate == 80.0
+    assert book.value == 100
+    assert scenario_book.value == 160
+    assert scenario.get_rate("JPYEUR") == 1 / 62.5
+
+    # a fork of the fork sees the fork's rate and the market's others
+    nested = scenario.fork()
+    nested_book = ArrayPortfolio("EUR", context=nested)
+    nested_book.transfer(aaa, 10)
+    assert nested_book.value == 160
+    eurusd.rate = 1.6
+    assert book.value == 78.125
+    assert scenario_book.value == pytest.approx(125)
+    assert nested_book.value == pytest.approx(125)
+    nested.set_rate("EURUSD", 1.25)
+    nested.set_price("AAA JP", 500.0)
+    assert nested_book.value == pytest.approx(80)
+    assert scenario_book.value == pytest.approx(125)
+    assert book.value == 78.125
+
+    with pytest.raises(ValueError):
+        FxRate("JPYUSD", 0.01, context=scenario)
+    with pytest.raises(ValueError):
+        scenario.set_rate("EURJPY", 1.0)
+
+
+def test_fork_cannot_price_portfolios():
+    market = MarketContext()
+    fund = Portfolio("USD", code="FUND", context=market)
+    fund.transfer(Cash("USD", market), 100)
+    scenario = market.fork()
+    with pytest.raises(ValueError):
+        scenario.set_price("FUND", 1.0)
+    assert scenario.get_asset("FUND") is fund
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from pylookback.assets import Portfolio, Stock, FxRate
+from pylookback.feeds import AsyncObserver, FakeFeed, FeedHandler
+
+
+def run(coroutine):
+    """ Run a coroutine on a new event loop, as asyncio.run does from
+        Python 3.7.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def test_feed_handler_coalesces_updates(counter):
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(aapl, 1)
+    portfolio.add_observer(counter)
+
+    async def main():
+        handler = FeedHandler()
+        handler.submit("ZZB AU", 3.0)
+        handler.submit("ZZB AU", 4.0)
+        handler.submit("AUDUSD", 0.8)
+        assert zzb.price == 2.0  # nothing applied until the loop turns
+        await asyncio.sleep(0)
+        assert zzb.price == 4.0 and audusd.rate == 0.8
+        assert counter.count == 1
+        with pytest.raises(ValueError):
+            handler.submit("AAA AU", 1.0)
+
+    run(main())
+    assert portfolio.value == 165.0
+
+
+def test_feed_handler_runs_feeds():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(aapl, 1)
+
+    prices = FakeFeed([(1, "ZZB AU", 2.5), (2, "AAPL US", 110.0)])
+    rates = FakeFeed([(1, "AUDUSD", 0.55), (2, "AUDUSD", 0.625)], 0.001)
+    run(FeedHandler().run(prices, rates))
+    assert zzb.price == 2.5 and aapl.price == 110.0
+    assert audusd.rate == 0.625
+    assert portfolio.value == 201.0
+
+
+def test_async_observer():
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    prices = list()
+
+    async def record(asset):
+        await asyncio.sleep(0.001)
+        prices.append(asset.price)
+
+    async def main():
+        observer = AsyncObserver(record)
+        zzb.add_observer(observer)
+        await FeedHandler().run(FakeFeed([(1, "ZZB AU", 3.0)]))
+        assert prices == []  # the feed does not wait for observers
+        await observer.drain()
+        zzb.remove_observer(observer)
+
+    run(main())
+    assert prices == [3.0]
+
+
+def test_async_observer_notified_outside_loop():
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    prices = list()
+
+    async def record(asset):
+        prices.append(asset.price)
+
+    loop = asyncio.new_event_loop()
+    try:
+        observer = AsyncObserver(record, loop)
+        zzb.add_observer(observer)
+        zzb.price = 3.0  # no loop is running
+        loop.run_until_complete(observer.drain())
+    finally:
+        loop.close()
+    assert prices == [3.0]
@@ -45,6 +45,7 @@ def test_already_created():
     with pytest.raises(ValueError):
         FxRate("AUDUSD", 0.75)
     assert audusd.rate == 0.65
+    assert FxRate.get("AUDUSD") == 0.65
 
 
 def test_observable():
@@ -108,3 +109,57 @@ def test_inverse_pair_creation():
 
     with pytest.raises(ValueError):
         FxRate("USDAUD", 2.0)
+
+
+def test_cross_rate():
+    eurusd = FxRate("EURUSD", 1.25)
+    usdjpy = FxRate("USDJPY", 100.0)
+    assert FxRate.get("EURJPY") == 125.0
+    assert FxRate.get("JPYEUR") == 1 / 1.25 / 100.0
+
+    # cached cross rates are refreshed when a leg changes
+    usdjpy.rate = 110.0
+    assert FxRate.get("EURJPY") == 1.25 * 110.0
+    eurusd.rate = 1.5
+    assert FxRate.get("EURJPY") == 1.5 * 110.0
+
+    with pytest.raises(ValueError):
+        FxRate.get("EURGBP")
+
+
+def test_cross_rate_shortest_path():
+    eurusd = FxRate("EURUSD", 1.25)
+    audusd = FxRate("AUDUSD", 0.5)
+    usdjpy = FxRate("USDJPY", 100.0)
+    assert FxRate.get("EURAUD") == 2.5
+    instances = FxRate.get_observable_instances("AUDJPY")
+    assert instances == [audusd, usdjpy]
+
+    # a direct pair replaces the cross rate
+    euraud = FxRate("EURAUD", 2.4)
+    assert FxRate.get("EURAUD") == 2.4
+    assert FxRate.get_observable_instances("AUDEUR") == [euraud]
+
+    # releasing the direct pair restores the cross rate
+    del euraud
+    assert FxRate.get("EURAUD") == eurusd.rate / audusd.rate
+
+
+def test_get_observable_instances():
+    audusd = FxRate("AUDUSD", 0.5)
+    assert FxRate.get_observable_instances("AUDAUD") == []
+    assert FxRate.get_observable_instances("AUDUSD") == [audusd]
+    assert FxRate.get_observable_instances("usdaud") == [audusd]
+    with pytest.raises(ValueError):
+        FxRate.get_observable_instances("AUDJPY")
+
+
+def test_get_rate_cell():
+    audusd = FxRate("AUDUSD", 0.5)
+    row, col = FxRate.get_rate_cell("usdaud")
+    assert row[col] == 2.0
+    audusd.rate = 0.8
+    assert row[col] == 1.25
+
+    del audusd
+    assert row[col] != row[col]  # nan once the rate is released
@@ -0,0 +1,85 @@
+import pytest
+from pylookback.assets import Portfolio, Stock, FxRate
+from pylookback.graph import DependencyGraph, depends_on, topological_order
+from pylookback.observable import Observable
+
+
+def test_dependency_graph(counter):
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB US", 2.0, "USD")
+    zzc = Stock("ZZC US", 3.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(zzc, 10)
+    portfolio.add_observer(counter)
+
+    graph = DependencyGraph([audusd])
+    # the rate, two holdings, the portfolio and its counter
+    assert len(graph) == 5
+    assert graph.nodes[0] is audusd and graph.nodes[-1] is counter
+    assert graph.fan_out(audusd) == 2
+    assert graph.total_fan_out(audusd) == 4
+    assert len(graph.edges) == 5
+    assert graph.fan_out_sizes()[portfolio] == 1
+    assert graph.fan_out(counter) == 0
+    assert zzb not in graph
+    with pytest.raises(ValueError):
+        graph.fan_out(zzb)
+    assert depends_on(portfolio, audusd)
+    assert not depends_on(audusd, portfolio)
+    del graph
+
+    # a diamond, the portfolio is revalued once per rate change
+    assert portfolio.rank > audusd.rank
+    audusd.rate = 0.25
+    assert counter.count == 1
+    assert portfolio.value == 200
+    portfolio.remove_observer(counter)
+
+
+def test_topological_order():
+    top = Observable()
+    left = Observable()
+    right = Observable()
+    bottom = Observable()
+    top.add_observer(left)
+    top.add_observer(right)
+    left.add_observer(bottom)
+    right.add_observer(bottom)
+    order = topological_order([top])
+    assert order[0] is top and order[-1] is bottom
+    assert (top.rank, left.rank, bottom.rank) == (0, 1, 2)
+
+    with pytest.raises(ValueError):
+        bottom.add_observer(top)
+    assert top not in bottom._observers
+
+
+class Relay(Observable):
+    def __init__(self, name, log):
+        super().__init__()
+        self.name = name
+        self.log = log
+
+    def observable_batch_update(self, observables):
+        self.log.append(self.name)
+        self.notify_observers()
+
+
+def test_rejected_cycle_keeps_ranks():
+    log = []
+    top = Relay("top", log)
+    left = Relay("left", log)
+    right = Relay("right", log)
+    bottom = Relay("bottom", log)
+    top.add_observer(left)
+    top.add_observer(right)
+    left.add_observer(bottom)
+    right.add_observer(bottom)
+    with pytest.raises(ValueError):
+        bottom.add_observer(top)
+    assert (top.rank, left.rank, right.rank, bottom.rank) == (0, 1, 1, 2)
+
+    top.notify_observers()
+    assert sorted(log[:2]) == ["left", "right"]
+    assert log[2:] == ["bottom"]
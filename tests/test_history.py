@@ -0,0 +1,78 @@
+import pytest
+from pylookback.assets import Portfolio, Stock, FxRate
+from pylookback.backtest import Tick
+from pylookback.history import HistoryWriter, PriceHistory
+
+
+def write_history(directory):
+    with HistoryWriter(directory) as writer:
+        for timestamp, price in ((1, 2.5), (2, 2.6), (4, 2.8)):
+            writer.add_price("ZZB AU", timestamp, price)
+        writer.add_price("AAPL US", 3, 300)
+        writer.add_price("AAPL US", 2, 290)  # out of order
+        writer.add_rate("AUDUSD", 1, 0.65)
+        writer.add_rate("AUDUSD", 3, 0.7)
+
+
+def test_as_of_lookups(tmp_path):
+    directory = str(tmp_path / "history")
+    write_history(directory)
+    with PriceHistory(directory) as history:
+        assert history.codes == ("AAPL US", "ZZB AU")
+        assert history.currency_pairs == ("AUDUSD",)
+        assert history.get_price("ZZB AU", 0) is None
+        assert history.get_price("ZZB AU", 1) == 2.5
+        assert history.get_price("ZZB AU", 3.5) == 2.6
+        assert history.get_price("ZZB AU", 100) == 2.8
+        assert history.get_price("AAPL US", 2.5) == 290
+        assert history.get_rate("AUDUSD", 2) == 0.65
+
+        assert history.prices_at(2) == {"ZZB AU": 2.6, "AAPL US": 290}
+        assert history.rates_at(0) == {}
+
+        with pytest.raises(ValueError):
+            history.get_price("CCC US", 1)
+
+
+def test_slices(tmp_path):
+    directory = str(tmp_path / "history")
+    write_history(directory)
+    history = PriceHistory(directory)
+    timestamps, prices = history.get_prices("ZZB AU", start=1.5, end=4)
+    assert list(timestamps) == [2, 4]
+    assert list(prices) == [2.6, 2.8]
+    timestamps.release()
+    prices.release()
+
+    timestamps, prices = history.get_prices("ZZB AU")
+    assert len(timestamps) == len(prices) == 3
+    del timestamps, prices
+    history.close()
+
+
+def test_rewind(tmp_path):
+    zzb = Stock("ZZB AU", 1.0, "AUD")
+    aapl = Stock("AAPL US", 1.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio = Portfolio("AUD")
+    portfolio.transfer(zzb, 100)
+    portfolio.transfer(aapl, 1)
+
+    directory = str(tmp_path / "history")
+    with HistoryWriter(directory) as writer:
+        writer.add_ticks(
+            [
+                Tick(1, "ZZB AU", 2.5),
+                Tick(1, "AUDUSD", 0.625),
+                Tick(2, "AAPL US", 300),
+                Tick(2, "ZZB AU", 3.0),
+            ]
+        )
+
+    with PriceHistory(directory) as history:
+        history.rewind(1)
+        assert (zzb.price, aapl.price, audusd.rate) == (2.5, 1.0, 0.625)
+        history.rewind(2)
+        assert portfolio.value == 100 * 3.0 + 300 / 0.625
+        history.rewind(1)
+        assert portfolio.value == 100 * 2.5 + 300 / 0.625
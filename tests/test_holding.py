@@ -10,3 +10,41 @@ def test_holding_init():
     base_currency_value = local_currency_value / audusd.rate
     assert holding.local_currency_value == local_currency_value
     assert holding.base_currency_value == base_currency_value
+
+
+def test_holding_cross_rate():
+    asset = Stock("AAA JP", 1000, "JPY")
+    eurusd = FxRate("EURUSD", 1.25)
+    usdjpy = FxRate("USDJPY", 100.0)
+    holding = Holding(asset, 10, "EUR")
+    assert holding.base_currency_value == 10 * 1000 / 125.0
+
+    # the holding observes every leg of the cross rate
+    usdjpy.rate = 80.0
+    assert holding.base_currency_value == 10 * 1000 / 100.0
+    eurusd.rate = 1.6
+    assert holding.base_currency_value == 10 * 1000 / 128.0
+
+
+def test_holding_slots():
+    asset = Stock("AAA US", 2.50, "USD")
+    holding = Holding(asset, 100, "USD")
+    assert not hasattr(holding, "__dict__")
+    assert holding.units == 100
+    assert holding.base_currency_value == 250
+
+
+def test_lazy_holding():
+    asset = Stock("AAA US", 2.50, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    holding = Holding(asset, 100, "AUD", lazy=True)
+    assert holding.lazy
+    assert holding.base_currency_value == 500
+
+    asset.price = 3.0
+    audusd.rate = 0.6
+    assert holding._local_currency_value == 250  # not yet revalued
+    assert holding.local_currency_value == 300
+    assert holding.base_currency_value == 500
+    holding.units = 60
+    assert holding.base_currency_value == 300
@@ -0,0 +1,60 @@
+import json
+import pytest
+from pylookback.assets import Asset, FxRate, Holding, Portfolio, Stock
+from pylookback.instrumentation import Instrumentation
+from pylookback.observable import Observable
+
+
+def test_instrumentation():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB US", 2.0, "USD")
+    zzc = Stock("ZZC US", 3.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(zzc, 10)
+    original = Observable.__dict__["notify_observers"]
+
+    with Instrumentation(by_code=True) as instrumentation:
+        assert instrumentation.enabled
+        assert Observable.__dict__["notify_observers"] is not original
+        zzb.price = 2.5
+        audusd.rate = 0.25
+        FxRate.get("USDAUD")
+    assert not instrumentation.enabled
+    assert Observable.__dict__["notify_observers"] is original
+    zzb.price = 3.0  # not counted once disabled
+
+    assert instrumentation.get_count("Stock._revalue") == 1
+    assert instrumentation.get_count("Holding._revalue") == 3
+    assert instrumentation.get_count("Portfolio.observable_update") == 1
+    assert instrumentation.get_count("Portfolio.observable_batch_update") == 1
+    assert instrumentation.get_count("FxRate.get") == 1
+    assert instrumentation.get_count("Cash._revalue") == 0
+
+    snapshot = json.loads(instrumentation.to_json())
+    revalue = snapshot["Holding._revalue"]
+    assert revalue["count"] == 3
+    assert sum(revalue["histogram_ns"].values()) == 3
+    assert revalue["codes"]["ZZB US"]["count"] == 2
+    assert list(snapshot["FxRate.get"]["codes"]) == ["USDAUD"]
+    assert "Cash._revalue" not in snapshot
+
+    instrumentation.reset()
+    assert instrumentation.snapshot() == {}
+    assert portfolio.value == 3.0 * 10 / 0.25 + 3.0 * 10 / 0.25
+
+
+def test_instrumentation_targets():
+    with pytest.raises(ValueError):
+        Instrumentation(targets=[(Stock, "revalue")]).enable()
+    assert Asset.__dict__["revalue"] is Asset.revalue
+
+    first = Instrumentation()
+    with first:
+        with pytest.raises(ValueError):
+            Instrumentation().enable()
+        assert first.enabled
+
+    with Instrumentation(targets=[(Holding, "_revalue")]) as only:
+        assert only.enabled
+    assert Holding.__dict__["_revalue"] is Holding._revalue
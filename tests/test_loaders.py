@@ -0,0 +1,60 @@
+import pytest
+from pylookback.assets import Stock, FxRate
+from pylookback.backtest import Tick, replay
+from pylookback.loaders import (
+    csv_to_tick_file,
+    merge_ticks,
+    read_csv_ticks,
+    read_tick_file,
+)
+
+
+def write_csv(path, text):
+    with open(path, "w") as file:
+        file.write(text)
+    return path
+
+
+def test_read_csv_ticks(tmp_path):
+    path = write_csv(
+        str(tmp_path / "bars.csv"),
+        "date,ticker,open,close\n1,ZZB AU,2.4,2.5\n2,ZZB AU,2.5,2.6\n",
+    )
+    ticks = read_csv_ticks(
+        path,
+        timestamp_column="date",
+        code_column="ticker",
+        value_column="close",
+        chunk_size=1,
+    )
+    assert list(ticks) == [Tick(1.0, "ZZB AU", 2.5), Tick(2.0, "ZZB AU", 2.6)]
+
+    with pytest.raises(ValueError):
+        list(read_csv_ticks(path))  # no timestamp column
+
+
+def test_csv_to_tick_file(tmp_path):
+    csv_path = write_csv(
+        str(tmp_path / "ticks.csv"),
+        "timestamp,code,value\n1,ZZB AU,2.5\n1,AUDUSD,0.65\n2,ZZB AU,2.6\n",
+    )
+    tick_path = str(tmp_path / "ticks.ticks")
+    csv_to_tick_file(csv_path, tick_path, chunk_size=2)
+    assert list(read_tick_file(tick_path)) == list(read_csv_ticks(csv_path))
+
+    # stopping early releases the file
+    ticks = read_tick_file(tick_path)
+    assert next(ticks) == Tick(1.0, "ZZB AU", 2.5)
+    ticks.close()
+
+
+def test_merge_and_replay(tmp_path):
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    audusd = FxRate("AUDUSD", 0.65)
+    prices = [Tick(1, "ZZB AU", 2.6), Tick(3, "ZZB AU", 2.7)]
+    rates = [Tick(2, "AUDUSD", 0.66), Tick(3, "AUDUSD", 0.67)]
+
+    seen = []
+    for timestamp in replay(merge_ticks(iter(prices), iter(rates))):
+        seen.append((timestamp, zzb.price, audusd.rate))
+    assert seen == [(1, 2.6, 0.65), (2, 2.6, 0.66), (3, 2.7, 0.67)]
@@ -36,3 +36,138 @@ def test_observable_messaging():
     assert observer.is_updated is False
     observable.notify_observers()
     assert observer.is_updated is True
+
+
+class CountingObserver:
+    def __init__(self):
+        self.updates = []
+
+    def observable_update(self, observable):
+        self.updates.append(observable)
+
+
+class BatchObserver:
+    def __init__(self):
+        self.batches = []
+
+    def observable_batch_update(self, observables):
+        self.batches.append(list(observables))
+
+
+def test_batch_updates_defer_notifications():
+    observer = CountingObserver()
+    observable = Observable()
+    observable.add_observer(observer)
+
+    with Observable.batch_updates():
+        observable.notify_observers()
+        observable.notify_observers()
+        assert observer.updates == []
+    # repeated notifications are deduplicated
+    assert observer.updates == [observable]
+
+
+def test_batch_updates_nested():
+    observer = CountingObserver()
+    observable = Observable()
+    observable.add_observer(observer)
+
+    with Observable.batch_updates():
+        with Observable.batch_updates():
+            observable.notify_observers()
+        assert observer.updates == []
+    assert observer.updates == [observable]
+
+
+def test_batch_observer_updated_once():
+    observer = BatchObserver()
+    observable1 = Observable()
+    observable2 = Observable()
+    observable1.add_observer(observer)
+    observable2.add_observer(observer)
+
+    with Observable.batch_updates():
+        observable1.notify_observers()
+        observable2.notify_observers()
+    assert observer.batches == [[observable1, observable2]]
+
+
+class Renotifier(Observable):
+    def observable_update(self, observable):
+        self.notify_observers()
+
+
+def test_observable_notifying_again_in_batch():
+    source = Observable()
+    middle = Renotifier()
+    source.add_observer(middle)
+    observer = CountingObserver()
+    middle.add_observer(observer)
+
+    # middle changes in the batch and then again when source updates it,
+    # its observer is still updated once
+    with Observable.batch_updates():
+        middle.notify_observers()
+        source.notify_observers()
+    assert observer.updates == [middle]
+
+
+def test_observers_allocated_lazily():
+    observable = Observable()
+    assert observable._observer_refs is None
+    observer1 = Observer()
+    observer2 = Observer()
+
+    observable.add_observer(observer1)
+    observable.add_observer(observer1)
+    assert list(observable._observers) == [observer1]
+
+    observable.add_observer(observer2)
+    assert len(observable._observers) == 2
+    observable.notify_observers()
+    assert observer1.is_updated and observer2.is_updated
+
+    single = Observable()
+    single.add_observer(observer1)
+    single.remove_observer(observer2)  # not observing, no error
+    single.remove_observer(observer1)
+    assert len(single._observers) == 0
+
+
+class Unsubscriber:
+    def __init__(self, observable, *others):
+        self.observable = observable
+        self.others = others
+        self.updates = 0
+
+    def observable_update(self, observable):
+        self.updates += 1
+        for other in self.others:
+            self.observable.remove_observer(other)
+
+
+def test_observers_removed_while_notifying():
+    observable = Observable()
+    observer1 = Unsubscriber(observable)
+    observer2 = Unsubscriber(observable, observer1)
+    observer1.others = (observer2,)
+    observable.add_observer(observer1)
+    observable.add_observer(observer2)
+    observable.notify_observers()
+    assert observer1.updates + observer2.updates >= 1
+    observer1.others = observer2.others = ()
+
+
+def test_thread_safety_toggle():
+    assert not Observable.thread_safety_enabled()
+    with Observable.locked():
+        pass
+    Observable.enable_thread_safety()
+    try:
+        assert Observable.thread_safety_enabled()
+        with Observable.locked():
+            with Observable.batch_updates():  # reentrant
+                pass
+    finally:
+        Observable.disable_thread_safety()
+    assert not Observable.thread_safety_enabled()
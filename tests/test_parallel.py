@@ -0,0 +1,34 @@
+from pylookback.actors.actor import Actor, Strategy
+from pylookback.assets import Portfolio, Stock, Cash
+from pylookback.backtest import Tick
+from pylookback.parallel import run_scenarios
+
+
+class BuyBelow(Strategy):
+    def __init__(self, portfolio, stock, limit):
+        self.portfolio = portfolio
+        self.stock = stock
+        self.limit = limit
+
+    def run(self):
+        if self.stock.price < self.limit:
+            self.portfolio.trade(self.stock, 1)
+
+
+def setup(limit):
+    portfolio = Portfolio("AUD")
+    portfolio.transfer(Cash("AUD"), 100)
+    zzb = Stock("ZZB AU", 10, "AUD")
+    return portfolio, [Actor(portfolio, BuyBelow(portfolio, zzb, limit))]
+
+
+def test_run_scenarios():
+    prices = [10, 8, 6, 8, 10]
+    ticks = [Tick(t, "ZZB AU", price) for t, price in enumerate(prices)]
+    timestamps, values = run_scenarios(setup, [0, 7, 9], ticks, 2)
+    assert list(timestamps) == [0, 1, 2, 3, 4]
+    assert list(values[0]) == [100] * 5  # never buys
+    assert list(values[1]) == [100, 100, 100, 102, 104]  # buys at 6
+    assert list(values[2]) == [100, 100, 98, 102, 108]  # buys below 9
+    # the parent's registries are untouched
+    assert not Portfolio.asset_code_exists("ZZB AU")
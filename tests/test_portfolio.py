@@ -1,5 +1,7 @@
+from threading import Thread
 import pytest
-from pylookback.assets import Portfolio, Stock, Cash, FxRate
+from pylookback.assets import Asset, Portfolio, Stock, Cash, FxRate
+from pylookback.observable import Observable
 
 
 def test_portfolio_init():
@@ -120,3 +122,208 @@ def test_portfolio_trade():
         - 300 * 1 / 0.7  # usd cash
     )
     assert round(portfolio.value, 2) == round(expected_value, 2)
+
+
+def test_update_prices_revalues_once():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    zzc = Stock("ZZC AU", 1.50, "AUD")
+    portfolio.transfer(zzb, 1000)
+    portfolio.transfer(zzc, 1000)
+
+    calls = []
+    batch_update = portfolio.observable_batch_update
+
+    def counting_batch_update(observables):
+        calls.append(len(observables))
+        batch_update(observables)
+
+    portfolio.observable_batch_update = counting_batch_update
+    Asset.update_prices({"ZZB AU": 3, "ZZC AU": 2})
+    assert calls == [2]
+    del portfolio.observable_batch_update  # break the reference cycle
+    assert portfolio.value == 1000 * 3 + 1000 * 2
+
+
+def test_incremental_value_matches_resum():
+    portfolio = Portfolio("AUD")
+    stocks = [Stock("ZZ%d AU" % i, 0.1 * (i + 1), "AUD") for i in range(20)]
+    for stock in stocks:
+        portfolio.transfer(stock, 3)
+    for tick in range(50):
+        for i, stock in enumerate(stocks):
+            stock.price = 0.1 * (i + 1) + 0.01 * tick
+    value = portfolio.value
+    portfolio.revalue()
+    assert portfolio.value == value
+
+
+def test_value_recovers_from_nonfinite_values():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.50, "AUD")
+    zzc = Stock("ZZC AU", 1.50, "AUD")
+    portfolio.transfer(zzb, 1000)
+    portfolio.transfer(zzc, 10)
+    zzb.price = float("inf")
+    assert portfolio.value == float("inf")
+    zzb.price = 2
+    assert portfolio.value == 2015
+    zzb.price = float("nan")
+    assert portfolio.value != portfolio.value
+    zzb.price = 2.0
+    zzc.price = 3.0
+    assert portfolio.value == 2030
+    assert portfolio.get_currency_exposure("AUD") == 2030
+
+
+def test_lazy_portfolio(counter):
+    portfolio = Portfolio("AUD", lazy=True)
+    assert portfolio.lazy
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(aapl, 1)
+    portfolio.transfer(Cash("USD"), 0)
+    assert portfolio.value == 220
+    portfolio.add_observer(counter)
+
+    for price in range(3, 10):
+        zzb.price = price
+    audusd.rate = 0.8
+    portfolio.trade(aapl, 1, 0)
+    # notified once when the portfolio first became dirty
+    assert counter.count == 1
+    assert portfolio.get_holding_value("AAPL US") == 250
+    assert portfolio.value == 90 + 250
+    assert counter.count == 1
+
+    zzb.price = 10
+    assert counter.count == 2
+    assert portfolio.value == 100 + 250
+    portfolio.revalue()
+    assert portfolio.value == 100 + 250
+
+
+def test_concurrent_price_updates():
+    Observable.enable_thread_safety()
+    try:
+        portfolio = Portfolio("AUD")
+        stocks = [Stock("ZZ%d AU" % i, 1.0, "AUD") for i in range(4)]
+        for stock in stocks:
+            portfolio.transfer(stock, 1)
+        errors = []
+
+        def update(stock):
+            try:
+                for i in range(2000):
+                    stock.price = 1.0 + i % 2
+                    with Observable.batch_updates():
+                        stock.price = 1.0
+                    assert portfolio.value in (4, 5, 6, 7, 8)
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        threads = [Thread(target=update, args=(s,)) for s in stocks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert portfolio.value == 4
+    finally:
+        Observable.disable_thread_safety()
+
+
+def test_fund_of_funds(counter):
+    fund = Portfolio("AUD", code="FUND")
+    sleeve = Portfolio("USD", code="SLEEVE")
+    unheld = Portfolio("USD")
+    assert Asset.get_asset_by_code("FUND") is fund
+    assert unheld.code is None
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+
+    sleeve.transfer(aapl, 2)
+    assert sleeve.price == sleeve.local_value == 200
+    assert sleeve.currency_code == "USD"
+    fund.transfer(zzb, 100)
+    fund.transfer(sleeve, 0.5)
+    assert fund.value == 200 + 200 * 0.5 / 0.5
+    assert fund.get_holding_value("SLEEVE") == 200
+
+    fund.add_observer(counter)
+    aapl.price = 150.0
+    assert sleeve.value == 300
+    assert fund.value == 200 + 300
+    audusd.rate = 0.25  # reaches the fund directly and via the sleeve
+    assert fund.value == 200 + 600
+    assert counter.count == 2
+    fund.remove_observer(counter)
+
+    with pytest.raises(ValueError):
+        sleeve.price = 1.0
+    with pytest.raises(ValueError):
+        fund.transfer(unheld, 1)
+    with pytest.raises(ValueError):
+        fund.transfer(fund, 1)
+    with pytest.raises(ValueError):
+        sleeve.transfer(fund, 1)
+    assert sleeve.holding_codes() == ("AAPL US",)
+
+
+def check_currency_exposures(lazy):
+    portfolio = Portfolio("AUD", lazy=lazy)
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(Cash("AUD"), 1000)
+    portfolio.transfer(zzb, 100)
+    portfolio.trade(aapl, 3)
+    assert portfolio.local_exposures() == {"AUD": 1200, "USD": 0}
+    assert portfolio.cash_by_currency() == {"AUD": 1000, "USD": -300}
+
+    aapl.price = 110.0
+    zzb.price = 3.0
+    assert portfolio.local_exposures() == {"AUD": 1300, "USD": 30}
+    audusd.rate = 0.25
+    assert portfolio.currency_exposures() == {"AUD": 1300, "USD": 120}
+    assert portfolio.get_currency_exposure("usd") == 120
+    assert portfolio.get_currency_exposure("EUR") == 0
+
+    portfolio.transfer(aapl, -3)
+    assert portfolio.local_exposures()["USD"] == -300
+    portfolio.revalue()
+    assert portfolio.local_exposures() == {"AUD": 1300, "USD": -300}
+    assert portfolio.value == 1300 - 1200
+
+
+def test_currency_exposures():
+    check_currency_exposures(lazy=False)
+    check_currency_exposures(lazy=True)
+
+
+def test_values_in():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    eurusd = FxRate("EURUSD", 1.25)
+    portfolio.transfer(zzb, 100)
+    portfolio.transfer(aapl, 2)
+    assert portfolio.value == 600
+
+    values = portfolio.values_in(["usd", "AUD", "EUR"])
+    assert list(values) == ["USD", "AUD", "EUR"]
+    assert values["USD"] == 300
+    assert values["AUD"] == portfolio.value
+    assert values["EUR"] == 240
+    assert portfolio.value_in("AUD") == 600
+
+    aapl.price = 150.0
+    audusd.rate = 0.25
+    eurusd.rate = 1.0
+    assert portfolio.values_in(["USD", "EUR"]) == {"USD": 350, "EUR": 350}
+    assert portfolio.value == 1400 == portfolio.value_in("AUD")
+    assert Portfolio("USD").values_in(["USD", "EUR"]) == {"USD": 0, "EUR": 0}
@@ -0,0 +1,33 @@
+from pylookback.assets.rate_matrix import RateMatrix
+
+
+def test_intern():
+    matrix = RateMatrix()
+    assert matrix.intern("AUD") == 0
+    assert matrix.intern("USD") == 1
+    assert matrix.intern("AUD") == 0
+    assert matrix.index("JPY") is None
+    assert matrix.currencies == ("AUD", "USD")
+
+
+def test_rates():
+    matrix = RateMatrix()
+    assert matrix.get("AUD", "USD") != matrix.get("AUD", "USD")  # nan
+    matrix.set_rate("AUD", "USD", 0.5)
+    assert matrix.get("AUD", "USD") == 0.5
+    assert matrix.get("USD", "AUD") == 2.0
+    assert matrix.get("AUD", "AUD") == 1.0
+    matrix.clear_rate("USD", "AUD")
+    assert matrix.get("AUD", "USD") != matrix.get("AUD", "USD")
+    assert matrix.get("AUD", "AUD") == 1.0
+
+
+def test_cells_survive_growth():
+    matrix = RateMatrix()
+    row, col = matrix.get_cell("AUD", "USD")
+    matrix.set_rate("AUD", "USD", 0.5)
+    for currency_code in ("EUR", "JPY", "GBP"):
+        matrix.intern(currency_code)
+    matrix.set_rate("AUD", "USD", 0.6)
+    assert row[col] == 0.6
+    assert len(row) == 5
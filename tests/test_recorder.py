@@ -0,0 +1,54 @@
+import pytest
+from pylookback.assets import ArrayPortfolio, Asset, Portfolio, Stock, Cash
+from pylookback.recorder import Recorder
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def test_recorder():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    portfolio.transfer(zzb, 10)
+    portfolio.transfer(Cash("AUD"), 100)
+
+    recorder = Recorder(portfolio, capacity=1, clock=Clock())
+    assert recorder.codes == ("AUD", "ZZB AU")  # in code order
+    zzb.price = 3.0
+    Asset.update_prices({"ZZB AU": 4.0})  # one record per batch
+    recorder.record()
+
+    assert len(recorder) == 3
+    assert list(recorder.timestamps) == [1, 2, 3]
+    assert list(recorder.values) == [130, 140, 140]
+    assert list(recorder.get_holding_values("zzb au")) == [30, 40, 40]
+    assert list(recorder.get_holding_values("AUD")) == [100, 100, 100]
+    with pytest.raises(ValueError):
+        recorder.get_holding_values("AAA AU")
+
+    recorder.stop()
+    zzb.price = 5.0
+    assert len(recorder) == 3
+
+
+def test_ring_recorder():
+    portfolio = ArrayPortfolio("AUD")
+    zzb = Stock("ZZB AU", 1.0, "AUD")
+    portfolio.transfer(zzb, 10)
+    recorder = Recorder(portfolio, capacity=3, ring=True, clock=Clock())
+    for price in range(2, 7):
+        zzb.price = float(price)
+    assert list(recorder.timestamps) == [3, 4, 5]
+    assert list(recorder.values) == [40, 50, 60]
+    assert list(recorder.get_holding_values("ZZB AU")) == [40, 50, 60]
+
+
+def test_recorder_expects_portfolio():
+    with pytest.raises(TypeError):
+        Recorder(Stock("ZZB AU", 1.0, "AUD"))
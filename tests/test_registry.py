@@ -0,0 +1,60 @@
+import pytest
+from pylookback.registry import Registry
+
+
+class Item:
+    pass
+
+
+def test_register_and_get():
+    registry = Registry()
+    item = Item()
+    registry.register("AAA", item)
+    assert "AAA" in registry
+    assert registry.get("AAA") is item
+    assert registry.get("BBB") is None
+    assert len(registry) == 1
+
+
+def test_unique_keys():
+    registry = Registry()
+    item = Item()
+    registry.register("AAA", item)
+    with pytest.raises(ValueError):
+        registry.register("AAA", Item())
+    assert registry.get("AAA") is item
+
+
+def test_keys_are_ordered():
+    registry = Registry()
+    items = [Item() for _ in range(3)]
+    for key, item in zip(["CCC", "AAA", "BBB"], items):
+        registry.register(key, item)
+    assert registry.keys() == ("AAA", "BBB", "CCC")
+    assert list(registry.values()) == [items[1], items[2], items[0]]
+
+
+def test_keys_released_on_collection():
+    registry = Registry()
+    keep = Item()
+    drop = Item()
+    registry.register("AAA", keep)
+    registry.register("BBB", drop)
+    del drop
+    assert "BBB" not in registry
+    assert registry.keys() == ("AAA",)
+
+    # the key can now be reused
+    new = Item()
+    registry.register("BBB", new)
+    assert registry.get("BBB") is new
+
+
+def test_unregister():
+    registry = Registry()
+    item = Item()
+    registry.register("AAA", item)
+    registry.unregister("AAA")
+    assert "AAA" not in registry
+    assert len(registry) == 0
+    registry.unregister("AAA")  # no error for unknown keys
@@ -0,0 +1,94 @@
+import pytest
+from pylookback.assets import (
+    ArrayPortfolio,
+    Asset,
+    Cash,
+    FxRate,
+    Portfolio,
+    Stock,
+)
+from pylookback.instrumentation import Instrumentation
+from pylookback.snapshot import restore_snapshot, save_snapshot
+
+
+def save_state(path):
+    fund = Portfolio("AUD", code="FUND")
+    sleeve = Portfolio("USD", lazy=True, code="SLEEVE")
+    book = ArrayPortfolio("EUR")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    usd = Cash("USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    eurusd = FxRate("EURUSD", 1.25)
+
+    sleeve.transfer(aapl, 2)
+    sleeve.transfer(usd, 50)
+    fund.transfer(zzb, 100)
+    fund.transfer(sleeve, 1)
+    book.transfer(aapl, 1)
+    book.transfer(zzb, 10)
+    aapl.price = 110.0
+    audusd.rate = 0.55
+    eurusd.rate = 1.1
+    save_snapshot(path, [book])
+    return fund.value, book.value
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "state.snapshot")
+    fund_value, book_value = save_state(path)
+    assert Asset.registered_codes() == []
+    assert not FxRate.currency_pair_exists("AUDUSD")
+
+    with Instrumentation() as instrumentation:
+        snapshot = restore_snapshot(path)
+    assert instrumentation.get_count("Holding._revalue") == 0
+    assert instrumentation.get_count("Observable.notify_observers") == 0
+
+    codes = [asset.code for asset in snapshot.assets]
+    assert sorted(codes) == ["AAPL US", "USD", "ZZB AU"]
+    assert [fx.currency_pair for fx in snapshot.fx_rates] == [
+        "AUDUSD",
+        "EURUSD",
+    ]
+    # held portfolios are restored before their holders
+    book, sleeve, fund = snapshot.portfolios
+    assert (book.code, sleeve.code, fund.code) == (None, "SLEEVE", "FUND")
+    assert sleeve.lazy and isinstance(book, ArrayPortfolio)
+    assert sleeve.value == 270
+    assert fund.value == fund_value
+    assert book.value == book_value
+    assert fund.get_holding_units("SLEEVE") == 1
+    assert FxRate.get("AUDEUR") == 0.55 / 1.1
+
+    # restored objects are observed as before
+    aapl = Asset.get_asset_by_code("AAPL US")
+    aapl.price = 120.0
+    assert sleeve.value == 290
+    assert fund.value == fund_value + 20 / 0.55
+    FxRate.get_instance("EURUSD").rate = 1.2
+    assert round(book.value, 9) == round(120 / 1.2 + 20 * 0.55 / 1.2, 9)
+
+    with pytest.raises(ValueError):
+        restore_snapshot(path)  # already registered
+
+
+def test_snapshot_unknown_type(tmp_path):
+    class Bond(Stock):
+        __slots__ = ()
+
+    path = str(tmp_path / "state.snapshot")
+    bond = Bond("ZZB 2030", 99.0, "AUD")
+    save_snapshot(path)
+    del bond
+    with pytest.raises(ValueError):
+        restore_snapshot(path)
+    assert Asset.registered_codes() == []
+    snapshot = restore_snapshot(path, asset_types=[Bond])
+    assert isinstance(snapshot.assets[0], Bond)
+    assert snapshot.assets[0].price == 99.0
+
+    with open(path, "wb") as file:
+        file.write(b"not a snapshot")
+    with pytest.raises(Exception):
+        restore_snapshot(path)
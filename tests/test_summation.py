@@ -0,0 +1,40 @@
+from math import fsum
+from pylookback.summation import RunningSum
+
+
+def test_running_sum_is_exact():
+    values = [0.1 * i for i in range(1, 100)]
+    total = RunningSum()
+    for value in values:
+        total.add(value)
+    assert total.value == fsum(values)
+
+
+def test_replace():
+    total = RunningSum([1e16, 1.0, -1e16])
+    assert total.value == 1.0
+    total.replace(1.0, 2.5)
+    assert total.value == 2.5
+
+
+def test_reset():
+    total = RunningSum([1.0, 2.0])
+    total.add(float("nan"))
+    assert total.value != total.value
+    total.reset([1.0, 2.0])
+    assert total.value == 3.0
+
+
+def test_replace_nonfinite():
+    inf = float("inf")
+    total = RunningSum([1.0, 2.0])
+    total.replace(2.0, inf)
+    assert total.value == inf
+    total.add(-inf)
+    assert total.value != total.value
+    total.replace(inf, 2.0)
+    assert total.value == -inf
+    total.replace(-inf, float("nan"))
+    assert total.value != total.value
+    total.replace(float("nan"), 0.5)
+    assert total.value == 3.5
@@ -0,0 +1,39 @@
+import pytest
+from pylookback.backtest import Tick
+from pylookback.tickfile import TickFile, TickWriter, write_ticks
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "prices.ticks")
+    ticks = [
+        Tick(1.0, "ZZB AU", 2.5),
+        Tick(1.0, "AUDUSD", 0.65),
+        Tick(2.0, "ZZB AU", 2.6),
+    ]
+    write_ticks(path, ticks, chunk_size=2)
+
+    with TickFile(path) as tick_file:
+        assert tick_file.codes == ("ZZB AU", "AUDUSD")
+        assert list(tick_file) == ticks
+        chunk_sizes = [len(chunk[0]) for chunk in tick_file.chunks()]
+        assert chunk_sizes == [2, 1]
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "empty.ticks")
+    write_ticks(path, [])
+    with TickFile(path) as tick_file:
+        assert tick_file.codes == ()
+        assert list(tick_file) == []
+
+
+def test_incomplete_file(tmp_path):
+    path = str(tmp_path / "open.ticks")
+    writer = TickWriter(path)
+    writer.write(Tick(1.0, "ZZB AU", 2.5))
+    writer._file.flush()
+    with pytest.raises(ValueError):
+        TickFile(path)
+    writer.close()
+    with TickFile(path) as tick_file:
+        assert len(list(tick_file)) == 1
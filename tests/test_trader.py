@@ -0,0 +1,133 @@
+import pytest
+from pylookback.actors.actor import Strategy
+from pylookback.actors.trader import (
+    Fill,
+    Order,
+    PercentCommission,
+    PerUnitCommission,
+    ProportionalSlippage,
+    Trader,
+    net_orders,
+)
+from pylookback.assets import Cash, FxRate, Portfolio, Stock
+
+
+def test_net_orders():
+    orders = [
+        ("zzb au", 10),
+        Order("AAPL US", 5),
+        ("ZZB AU", -4),
+        ("AAPL US", -5),
+    ]
+    assert net_orders(orders) == [Order("ZZB AU", 6)]
+
+
+def test_orders_applied_once(counter):
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(Cash("AUD"), 1000)
+    portfolio.transfer(aapl, 1)
+    portfolio.add_observer(counter)
+
+    trader = Trader(portfolio)
+    trader.submit([("ZZB AU", 100), ("AAPL US", 2), ("ZZB AU", -50)])
+    assert len(trader.orders) == 3
+    fills = trader.execute()
+    assert fills == [Fill("ZZB AU", 50, 2.0, 0.0), Fill("AAPL US", 2, 100, 0)]
+    assert trader.orders == ()
+    assert counter.count == 1
+    assert portfolio.get_holding_units("ZZB AU") == 50
+    assert portfolio.get_holding_units("AAPL US") == 3
+    assert portfolio.get_holding_units("AUD") == 900
+    assert portfolio.get_holding_units("USD") == -200
+    assert portfolio.value == 900 + 100 + 600 - 400
+
+    # nothing to do
+    assert trader.execute() == []
+    assert counter.count == 1
+
+    # the filled holdings follow the market
+    zzb.price = 3.0
+    audusd.rate = 0.25
+    assert portfolio.value == 900 + 150 + (300 - 200) / 0.25
+
+
+def test_slippage_and_commission():
+    portfolio = Portfolio("USD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    portfolio.transfer(aapl, 10)
+    trader = Trader(
+        portfolio,
+        slippage=ProportionalSlippage(50),
+        commission=PercentCommission(1, minimum=5),
+    )
+    trader.submit([("AAPL US", 10)])
+    fill, = trader.execute()
+    assert fill.price == pytest.approx(100.5)
+    assert fill.commission == pytest.approx(10.05)
+    assert portfolio.get_holding_units("USD") == pytest.approx(-1015.05)
+
+    trader.submit([("AAPL US", -1)])
+    fill, = trader.execute()
+    assert fill.price == pytest.approx(99.5)
+    assert fill.commission == 5
+    assert portfolio.get_holding_units("USD") == pytest.approx(-920.55)
+
+    assert PerUnitCommission(0.02).get_commission(aapl, -50, 100) == 1.0
+
+
+def test_target_weights():
+    portfolio = Portfolio("AUD")
+    zzb = Stock("ZZB AU", 2.0, "AUD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    msft = Stock("MSFT US", 50.0, "USD")
+    audusd = FxRate("AUDUSD", 0.5)
+    portfolio.transfer(Cash("AUD"), 1000)
+    portfolio.transfer(msft, 4)
+    assert portfolio.value == 1400
+
+    trader = Trader(portfolio)
+    trader.target_weights({"zzb au": 0.5, "AAPL US": 0.25})
+    orders = dict(trader.orders)
+    assert orders == {"ZZB AU": 350, "AAPL US": 1.75, "MSFT US": -4}
+    trader.execute()
+    assert portfolio.get_holding_value("ZZB AU") == 700
+    assert portfolio.get_holding_value("AAPL US") == 350
+    assert portfolio.get_holding_units("MSFT US") == 0
+    assert portfolio.value == pytest.approx(1400)
+    assert portfolio.get_holding_units("USD") == pytest.approx(25)
+
+    # the US dollar holdings and cash revalue with the rate
+    audusd.rate = 0.25
+    assert portfolio.get_holding_value("AAPL US") == 1.75 * aapl.price * 4
+    assert portfolio.get_holding_value("USD") == pytest.approx(100)
+    assert portfolio.value == pytest.approx(1400 + 350 + 50)
+    # while the local holding does not
+    assert portfolio.get_holding_value("ZZB AU") == 350 * zzb.price
+
+
+class Rebalance(Strategy):
+    def __init__(self, weights):
+        self.weights = weights
+        self.trader = None
+
+    def run(self):
+        self.trader.target_weights(self.weights)
+
+
+def test_perform_runs_strategy():
+    portfolio = Portfolio("USD")
+    aapl = Stock("AAPL US", 100.0, "USD")
+    portfolio.transfer(Cash("USD"), 1000)
+    strategy = Rebalance({"AAPL US": 0.5})
+    trader = Trader(portfolio, strategy)
+    strategy.trader = trader
+    trader.perform()
+    assert portfolio.get_holding_units("AAPL US") == 5
+    aapl.price = 200.0
+    trader.perform()
+    assert portfolio.get_holding_units("AAPL US") == pytest.approx(3.75)
+    assert portfolio.value == pytest.approx(1500)
+    strategy.trader = None